@@ -1,39 +1,69 @@
+import io
+import time
+
 import streamlit as st
 import pandas as pd
-from unidecode import unidecode
 from main import main_kpi, main_comparativo, heatmap_ventas
 from main import kpi_cpc
+from utils import (
+    almacen, cache_ingesta, columnas, derivadas, ingesta_csv, ingesta_fondo, lector_excel, lectura_paralela, memo,
+    motor_sql, snapshot, tipos,
+)
 
 st.set_page_config(layout="wide")
 
-# 🛠️ FUNCIÓN: Normalización de encabezados
-def normalizar_columnas(df):
-    nuevas_columnas = []
-    for col in df.columns:
-        col_str = str(col).lower().strip().replace(" ", "_")
-        col_str = unidecode(col_str)
-        nuevas_columnas.append(col_str)
-    df.columns = nuevas_columnas
-    return df
-
-# 🛠️ FUNCIÓN: Carga de Excel con detección de múltiples hojas y CONTPAQi
-def detectar_y_cargar_archivo(archivo):
-    xls = pd.ExcelFile(archivo)
-    hojas = xls.sheet_names
+# 🛠️ FUNCIÓN: Nombres de hojas del libro (memorizados por huella para no reabrir el archivo)
+def obtener_hojas(archivo, huella):
+    hojas_por_huella = st.session_state.setdefault("_hojas_por_huella", {})
+    if huella not in hojas_por_huella:
+        hojas_por_huella.clear()
+        hojas_por_huella[huella] = lector_excel.nombres_hojas(archivo)
+    return hojas_por_huella[huella]
 
+# 🛠️ FUNCIÓN: Selección de hoja a leer (múltiples hojas → "X AGENTE")
+def elegir_hoja(hojas):
     # Caso 1: Si hay múltiples hojas → Forzar lectura de "X AGENTE"
     if len(hojas) > 1:
         if "X AGENTE" in hojas:
-            hoja = "X AGENTE"
             st.info(f"📌 Archivo con múltiples hojas detectado. Leyendo hoja 'X AGENTE'.")
+            return "X AGENTE"
+        st.warning("⚠️ Múltiples hojas detectadas pero no se encontró la hoja 'X AGENTE'. Selecciona manualmente.")
+        return st.sidebar.selectbox("📄 Selecciona la hoja a leer", hojas)
+
+    # Caso 2: Solo una hoja → Detectar si es CONTPAQi
+    st.info(f"✅ Solo una hoja encontrada: **{hojas[0]}**. Procediendo con detección CONTPAQi.")
+    return hojas[0]
+
+# 🛠️ FUNCIÓN: Mostrar los avisos de la carga (se juntan en la lectura porque puede correr en segundo plano)
+def mostrar_avisos(avisos):
+    for tipo, contenido in avisos:
+        if tipo == "columnas":
+            with st.expander("🛠️ Debug - Columnas leídas desde X AGENTE"):
+                st.write(contenido)
         else:
-            st.warning("⚠️ Múltiples hojas detectadas pero no se encontró la hoja 'X AGENTE'. Selecciona manualmente.")
-            hoja = st.sidebar.selectbox("📄 Selecciona la hoja a leer", hojas)
-        df = pd.read_excel(xls, sheet_name=hoja)
-        df = normalizar_columnas(df)
+            getattr(st, tipo)(contenido)
 
-        with st.expander("🛠️ Debug - Columnas leídas desde X AGENTE"):
-            st.write(df.columns.tolist())
+# 🛠️ FUNCIÓN: Carga de Excel con detección de múltiples hojas y CONTPAQi (sin llamadas a st: devuelve avisos)
+def detectar_y_cargar_archivo(archivo, hojas, hoja, motor=lector_excel.MOTOR_AUTO, hojas_extra=(), procesos=None,
+                              progreso=None):
+    extras = {}
+    avisos = []
+    if len(hojas) > 1:
+        # La hoja de ventas también puede ser una hoja CxC: se lee una sola vez y se comparte
+        otras = [h for h in hojas_extra if h != hoja]
+        if procesos:
+            # Una hoja por proceso; vuelven como Arrow IPC y se convierten a dtypes NumPy para la normalización
+            leidas = lectura_paralela.leer_hojas(archivo, [hoja, *otras], motor=motor, procesos=procesos,
+                                                 arrow=False, progreso=progreso)
+        else:
+            # Hoja de ventas y hojas CxC en paralelo (cada grupo con su propia apertura del libro)
+            leidas = ingesta_fondo.leer_hojas_paralelo(archivo, [[hoja], otras], motor=motor, progreso=progreso)
+        extras = {h: leidas[h] for h in hojas_extra}
+        # Copia si la hoja también va a CxC: la normalización de ventas modifica el DataFrame
+        df = leidas[hoja].copy() if hoja in extras else leidas[hoja]
+        df = columnas.normalizar_columnas(df)
+
+        avisos.append(("columnas", df.columns.tolist()))
 
         # Generación virtual de columnas año y mes para X AGENTE
         if hoja == "X AGENTE":
@@ -42,49 +72,303 @@ def detectar_y_cargar_archivo(archivo):
                     df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
                     df["año"] = df["fecha"].dt.year
                     df["mes"] = df["fecha"].dt.month
-                    st.success("✅ Columnas virtuales 'año' y 'mes' generadas correctamente desde 'fecha' en X AGENTE.")
+                    avisos.append(("success", "✅ Columnas virtuales 'año' y 'mes' generadas correctamente desde 'fecha' en X AGENTE."))
                 except Exception as e:
-                    st.error(f"❌ Error al procesar la columna 'fecha' en X AGENTE: {e}")
+                    avisos.append(("error", f"❌ Error al procesar la columna 'fecha' en X AGENTE: {e}"))
             else:
-                st.error("❌ No existe columna 'fecha' en X AGENTE para poder generar 'año' y 'mes'.")
+                avisos.append(("error", "❌ No existe columna 'fecha' en X AGENTE para poder generar 'año' y 'mes'."))
 
     else:
-        # Caso 2: Solo una hoja → Detectar si es CONTPAQi
-        hoja = hojas[0]
-        st.info(f"✅ Solo una hoja encontrada: **{hoja}**. Procediendo con detección CONTPAQi.")
-        preview = pd.read_excel(xls, sheet_name=hoja, nrows=5, header=None)
+        preview = lector_excel.leer_preview(archivo, hoja, nrows=5)
         contiene_contpaqi = preview.iloc[0, 0]
         skiprows = 3 if isinstance(contiene_contpaqi, str) and "contpaqi" in contiene_contpaqi.lower() else 0
         if skiprows:
-            st.info("📌 Archivo CONTPAQi detectado. Saltando primeras 3 filas.")
-        df = pd.read_excel(xls, sheet_name=hoja, skiprows=skiprows)
-        df = normalizar_columnas(df)
+            avisos.append(("info", "📌 Archivo CONTPAQi detectado. Saltando primeras 3 filas."))
+        ingesta_fondo.avanzar(progreso, etapa="Leyendo hoja", hojas_total=1)
+        df = lector_excel.leer_hoja(archivo, hoja, motor=motor, skiprows=skiprows)
+        ingesta_fondo.avanzar(progreso, hojas=1, filas=len(df))
+        df = columnas.normalizar_columnas(df)
+
+    return df, extras, avisos
 
+# 🛠️ FUNCIÓN: Detectar y renombrar columna de año (alias y variantes mal codificadas en utils/columnas.py)
+def normalizar_anio(df):
+    df = columnas.renombrar_canonicas(df, ["año"])
+
+    if "año" in df.columns:
+        df["año"] = pd.to_numeric(df["año"], errors="coerce")
     return df
 
-archivo = st.sidebar.file_uploader("📂 Sube archivo de ventas (.csv o .xlsx)", type=["csv", "xlsx"])
+# 🛠️ FUNCIÓN: Lectura + normalización completa (lo que se guarda en caché)
+#   Sin llamadas a st: puede correr en el hilo de ingesta en segundo plano ('progreso' lo consulta la interfaz)
+def cargar_y_normalizar(archivo, hojas=None, hoja=None, motor=lector_excel.MOTOR_AUTO, hojas_extra=(), float32=False,
+                        filas_por_bloque=None, preagregar=False, procesos=None, progreso=None):
+    extras = {}
+    avisos = []
+    if archivo.name.endswith(".csv") and filas_por_bloque:
+        # CSV por bloques: normalización y tipos bloque a bloque (opcionalmente pre-agregado a mes × agente × línea)
+        lector = ingesta_csv.leer_csv_agregado if preagregar else ingesta_csv.leer_csv
+        df, reporte_memoria = lector(
+            archivo, lambda bloque: normalizar_anio(columnas.normalizar_columnas(bloque)), filas_por_bloque, float32,
+            progreso=progreso
+        )
+        return {"ventas": df, "cxc": extras, "memoria": reporte_memoria, "avisos": avisos}
 
-if archivo:
     if archivo.name.endswith(".csv"):
-        df = pd.read_csv(archivo)
-        df = normalizar_columnas(df)
+        ingesta_fondo.avanzar(progreso, etapa="Leyendo CSV")
+        df = pd.read_csv(io.BytesIO(archivo.getvalue()))
+        ingesta_fondo.avanzar(progreso, filas=len(df))
+        df = columnas.normalizar_columnas(df)
     else:
-        df = detectar_y_cargar_archivo(archivo)
+        df, extras, avisos = detectar_y_cargar_archivo(archivo.getvalue(), hojas, hoja, motor, hojas_extra, procesos,
+                                                          progreso)
 
-    # Guardar archivo original para KPI CxC
-    st.session_state["archivo_excel"] = archivo
+    df = normalizar_anio(df)
 
-    # Detectar y renombrar columna de año
-    for col in df.columns:
-        if col in ["ano", "anio", "año", "aÃ±o", "aã±o"]:
-            df = df.rename(columns={col: "año"})
-            break
+    # Tipos por esquema: dimensiones → category, importes → float, fecha → datetime64
+    ingesta_fondo.avanzar(progreso, etapa="Normalizando tipos")
+    df, reporte_memoria = tipos.aplicar_tipos(df, float32=float32)
 
-    if "año" in df.columns:
-        df["año"] = pd.to_numeric(df["año"], errors="coerce")
+    return {"ventas": df, "cxc": extras, "memoria": reporte_memoria, "avisos": avisos}
+
+# 🛠️ FUNCIÓN: Progreso de la ingesta en segundo plano; al terminar, rerun completo para cambiar de dataset
+@st.fragment(run_every=1.0)
+def mostrar_progreso(clave, nombre):
+    trabajo = ingesta_fondo.trabajo(clave)
+    if trabajo is None or trabajo["futuro"].done():
+        st.rerun()
+
+    progreso = trabajo["progreso"]
+    texto = (
+        f"⏳ Cargando **{nombre}** · {progreso['etapa']} · "
+        f"hojas {progreso['hojas_leidas']}/{progreso['hojas_total'] or '?'} · "
+        f"{progreso['filas']:,} filas · {time.time() - progreso['inicio']:.0f}s"
+    )
+    fraccion = progreso["hojas_leidas"] / progreso["hojas_total"] if progreso["hojas_total"] else 0.0
+    st.progress(min(fraccion, 1.0), text=texto)
+
+archivo = st.sidebar.file_uploader("📂 Sube archivo de ventas (.csv o .xlsx)", type=["csv", "xlsx"])
+
+with st.sidebar.expander("⚙️ Lectura avanzada"):
+    motor_excel = st.selectbox(
+        "Motor de lectura Excel",
+        [lector_excel.MOTOR_AUTO] + lector_excel.motores_disponibles(),
+        help="'auto' usa el motor más rápido instalado y recurre al siguiente si falla."
+    )
+    st.session_state["motor_excel"] = motor_excel
+    importes_float32 = st.checkbox("Importes en float32 (menos memoria)", value=False)
+    st.session_state["motor_agregacion"] = st.selectbox(
+        "Motor de agregación",
+        motor_sql.motores_disponibles(),
+        help="pandas agrupa en memoria; duckdb/sqlite copian las columnas necesarias a un archivo local y agrupan "
+             "con SQL. El dataset sigue cargado en memoria: no sirve para archivos más grandes que la RAM."
+    )
+    procesos_hojas = None
+    if lectura_paralela.nucleos() > 1:
+        if st.checkbox(
+            "Leer hojas en procesos paralelos", value=False,
+            help="Cada hoja del libro se lee en su propio proceso (un núcleo por hoja)."
+        ):
+            procesos_hojas = lectura_paralela.procesos_por_defecto()
+    cargar_en_fondo = st.checkbox(
+        "Cargar archivos en segundo plano", value=True,
+        help="La lectura corre en un hilo aparte: puedes seguir navegando con el dataset anterior."
+    )
+    csv_por_bloques = st.checkbox(
+        "Leer CSV por bloques (memoria acotada)", value=False,
+        help="Normaliza y convierte tipos bloque a bloque en vez de cargar todo el CSV como texto."
+    )
+    filas_por_bloque = None
+    preagregar_csv = False
+    if csv_por_bloques:
+        filas_por_bloque = int(st.number_input(
+            "Filas por bloque", min_value=10_000, max_value=5_000_000,
+            value=ingesta_csv.FILAS_POR_BLOQUE, step=50_000
+        ))
+        preagregar_csv = st.checkbox(
+            "Pre-agregar a mes × agente × línea", value=False,
+            help="Guarda una fila por mes, agente y línea (fecha = día 1). "
+                 "Operaciones y detalle por factura dejan de estar disponibles."
+        )
+
+FUENTE_ARCHIVO = "Archivo subido"
+FUENTE_ALMACEN = "Almacén local"
+FUENTE_ALMACEN_AGREGADO = "Almacén local (pre-agregado)"
 
-    for col in df.select_dtypes(include='object').columns:
-        df[col] = df[col].astype(str)
+fuente = FUENTE_ARCHIVO
+agregar_al_almacen = False
+if almacen.disponible():
+    with st.sidebar.expander("🗄️ Almacén local"):
+        fuente = st.radio("Fuente de datos", [FUENTE_ARCHIVO, FUENTE_ALMACEN, FUENTE_ALMACEN_AGREGADO])
+        agregar_al_almacen = st.button(
+            "➕ Agregar archivo al almacén", disabled=archivo is None,
+            help="Agrega sólo las filas nuevas (sin duplicar fecha + folio/factura + importe)."
+        )
+        estado_almacen = st.empty()
+        if st.button("🗑️ Vaciar almacén"):
+            almacen.vaciar()
+            st.rerun()
+
+datos = None
+ingesta_pendiente = None
+if archivo:
+    huella = cache_ingesta.huella_archivo(archivo)
+    hojas = hoja = None
+    es_csv = archivo.name.endswith(".csv")
+    if not es_csv:
+        hojas = obtener_hojas(archivo, huella)
+        hoja = elegir_hoja(hojas)
+
+    # Hojas CxC presentes en el mismo libro: se leen junto con la hoja de ventas
+    hojas_cxc = [h for h in kpi_cpc.HOJAS_CXC if hojas and len(hojas) > 1 and h in hojas]
+
+    partes_variante = ["f32"] if importes_float32 else []
+    if es_csv and preagregar_csv:
+        # Pre-agregado es otro dataset (una fila por mes × agente × línea): otra entrada de caché
+        partes_variante.append("agr")
+    variante = "_".join(partes_variante)
+    clave = cache_ingesta.clave_cache(huella, hoja, variante)
+    datos = cache_ingesta.obtener(clave)
+    origen = "caché"
+    if datos is None:
+        df = snapshot.leer(huella, hoja, variante)
+        origen = "snapshot"
+        if df is None:
+            argumentos = (
+                archivo, hojas, hoja, motor_excel, hojas_cxc, importes_float32, filas_por_bloque, preagregar_csv,
+                procesos_hojas,
+            )
+            origen = "archivo"
+            # Un archivo cuya lectura falló no se vuelve a leer en cada rerun: el error se recuerda
+            # hasta que se sube otro archivo (o el mismo de nuevo)
+            intento = (getattr(archivo, "file_id", None), clave)
+            fallido = st.session_state.get("_ingesta_fallida")
+            if fallido and fallido[0] == intento:
+                st.sidebar.error(f"❌ Error al leer {archivo.name}: {fallido[1]}")
+            elif cargar_en_fondo:
+                # Lectura en el hilo de ingesta; hasta que termine la sesión sigue con el dataset anterior
+                ingesta_fondo.iniciar(clave, cargar_y_normalizar, *argumentos)
+                try:
+                    datos = ingesta_fondo.recoger(clave)
+                    ingesta_pendiente = clave if datos is None else None
+                except Exception as e:
+                    st.session_state["_ingesta_fallida"] = (intento, str(e))
+                    st.sidebar.error(f"❌ Error al leer {archivo.name}: {e}")
+            else:
+                datos = cargar_y_normalizar(*argumentos)
+            if datos is not None:
+                snapshot.escribir(datos["ventas"], huella, hoja, variante)
+                mostrar_avisos(datos["avisos"])
+        else:
+            datos = {
+                "ventas": df,
+                "cxc": lector_excel.leer_hojas(archivo, hojas_cxc, motor=motor_excel),
+                "memoria": {"memoria_despues_mb": round(tipos.memoria_mb(df), 2)},
+            }
+        if datos is not None:
+            # Si otra sesión guardó el mismo archivo mientras tanto, se comparte su dataset
+            datos = cache_ingesta.guardar(clave, datos)
+
+    if ingesta_pendiente:
+        with st.sidebar:
+            mostrar_progreso(ingesta_pendiente, archivo.name)
+        # Cambio atómico: hasta tener el dataset completo se sigue mostrando el anterior (si lo hay)
+        anterior = st.session_state.get("_dataset_activo")
+        if anterior is not None:
+            clave, datos = anterior
+            origen = "anterior"
+
+    if agregar_al_almacen:
+        if ingesta_pendiente:
+            st.sidebar.warning("⏳ Espera a que termine la carga del archivo para agregarlo al almacén.")
+        elif es_csv and preagregar_csv:
+            st.sidebar.error("❌ Desactiva la pre-agregación del CSV para agregarlo al almacén.")
+        elif datos is not None:
+            try:
+                resultado = almacen.agregar(derivadas.sin_derivadas(datos), huella, archivo.name)
+                if resultado["ya_ingerido"]:
+                    st.sidebar.info("ℹ️ Este archivo ya estaba en el almacén.")
+                else:
+                    st.sidebar.success(
+                        f"✅ {resultado['nuevas']:,} filas nuevas · {resultado['duplicadas']:,} duplicadas omitidas · "
+                        f"{len(resultado['periodos'])} meses actualizados"
+                    )
+            except ValueError as e:
+                st.sidebar.error(f"❌ {e}")
+
+if almacen.disponible():
+    manifiesto_almacen = almacen.manifiesto()
+    estado_almacen.caption(
+        f"{sum(manifiesto_almacen['particiones'].values()):,} filas · "
+        f"{len(manifiesto_almacen['particiones'])} meses · "
+        f"{len(manifiesto_almacen['archivos'])} archivos"
+    )
+
+if fuente != FUENTE_ARCHIVO:
+    # El almacén es la fuente: se carga una vez por versión (cada alta de archivo o vaciado crea una revisión nueva)
+    hoja = None
+    variante = "agr" if fuente == FUENTE_ALMACEN_AGREGADO else ""
+    clave = cache_ingesta.clave_cache(f"almacen-{almacen.version()}", None, variante)
+    datos = cache_ingesta.obtener(clave)
+    origen = "almacén"
+    if datos is None:
+        df = almacen.cargar_agregados() if variante else almacen.cargar()
+        if df is None or df.empty:
+            st.warning("⚠️ El almacén local está vacío. Sube un archivo y agrégalo al almacén.")
+            datos = None
+        else:
+            datos = {"ventas": df, "cxc": None, "memoria": {"memoria_despues_mb": round(tipos.memoria_mb(df), 2)}}
+            datos = cache_ingesta.guardar(clave, datos)
+
+if datos is not None:
+    # Columnas derivadas (anio, tipo_cambio, valor_mn_calc, agente) una vez por dataset y tabla de tasas
+    derivadas.asegurar_derivadas(datos)
+
+    # Copia superficial: los módulos renombran/agregan columnas sin alterar la versión compartida en caché
+    df = datos["ventas"].copy(deep=False)
+    st.session_state["_dataset_activo"] = (clave, datos)
+    st.session_state["hojas_cxc"] = datos["cxc"]
+    st.session_state[memo.CLAVE_ARTEFACTOS] = datos.setdefault("artefactos", {})
+
+    with st.expander("🛠️ Caché de ingesta (debug)"):
+        stats = cache_ingesta.estadisticas(clave)
+        if origen == "anterior":
+            st.info("⏳ Se usa el dataset anterior mientras el archivo nuevo se carga en segundo plano.")
+        elif stats["ultimo"] == "HIT":
+            st.success("✅ HIT: datos reutilizados sin volver a leer el archivo.")
+        elif origen == "snapshot":
+            st.info("💾 MISS: datos cargados desde snapshot columnar en disco.")
+        elif origen == "almacén":
+            st.info("🗄️ MISS: datos cargados desde el almacén local.")
+        else:
+            st.warning("🔄 MISS: archivo leído y normalizado desde cero.")
+        if not snapshot.disponible():
+            st.write("Snapshots deshabilitados (instala `pyarrow`).")
+        st.write(f"Clave: `{clave[:12]}…{hoja or ''}`")
+        st.write(f"Entradas: {stats['entradas']}/{stats['max_entradas']} · Hits: {stats['hits']} · Misses: {stats['misses']}")
+        st.write(
+            f"Caché compartida: {stats['compartidas']} datasets · {stats['mb']:,.1f}/{stats['max_mb']:,} MB · "
+            f"sesiones usando este dataset: {stats['sesiones']}"
+        )
+        if lector_excel.registro_tiempos:
+            st.write("Tiempos de lectura por motor:")
+            st.dataframe(pd.DataFrame(
+                list(lector_excel.registro_tiempos),
+                columns=["motor", "hoja", "segundos", "ok"]
+            ))
+
+        memoria = datos["memoria"]
+        if "memoria_antes_mb" in memoria:
+            st.write(
+                f"🧠 Memoria del DataFrame: {memoria['memoria_antes_mb']:,.1f} MB → "
+                f"{memoria['memoria_despues_mb']:,.1f} MB (x{memoria['reduccion']} menos)"
+            )
+        else:
+            st.write(f"🧠 Memoria del DataFrame: {memoria['memoria_despues_mb']:,.1f} MB")
+
+    # Guardar archivo original para KPI CxC (el nuevo sólo cuando su dataset ya está activo)
+    if archivo and not ingesta_pendiente:
+        st.session_state["archivo_excel"] = archivo
 
     # Detectar columna de ventas
     columnas_ventas_usd = ["valor_usd", "ventas_usd", "ventas_usd_con_iva"]
@@ -98,11 +382,7 @@ if archivo:
         st.success(f"✅ Columna de ventas detectada: **{columna_encontrada}**")
         st.session_state["columna_ventas"] = columna_encontrada
 
-    if "fecha" in df.columns:
-        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
-
     st.session_state["df"] = df
-    st.session_state["archivo_path"] = archivo
 
     if "año" in df.columns:
         with st.expander("🛠️ Diagnóstico de columnas (debug)"):
@@ -141,6 +421,6 @@ elif menu == "🔥 Heatmap Ventas":
 
 elif menu == "💳 KPI Cartera CxC":
     if "archivo_excel" in st.session_state:
-        kpi_cpc.run(st.session_state["archivo_excel"])
+        kpi_cpc.run(st.session_state["archivo_excel"], st.session_state.get("hojas_cxc"))
     else:
         st.warning("⚠️ Primero sube un archivo para visualizar CXC.")
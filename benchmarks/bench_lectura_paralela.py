@@ -0,0 +1,108 @@
+# ⚡ Benchmark: lectura de hojas en serie (lector_excel) vs. pool de procesos (utils/lectura_paralela)
+#
+# Genera libros sintéticos con varias hojas y mide cómo escala la lectura con el número de procesos.
+# Cada configuración se mide con el pool ya arrancado (el arranque de procesos 'spawn' se reporta aparte).
+#
+# Uso (desde la raíz del repo):
+#   python -m benchmarks.bench_lectura_paralela
+#   python -m benchmarks.bench_lectura_paralela --libros 3 --hojas 4 --filas 100000 --procesos 1 2 4 8
+import argparse
+import io
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils import lector_excel, lectura_paralela
+
+
+def generar_hoja(n, semilla):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "fecha": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 365 * 8, n), unit="D"),
+        "folio": rng.integers(1, 10_000_000, n),
+        "agente": rng.choice([f"AGENTE {i}" for i in range(40)], n),
+        "cliente": rng.choice([f"CLIENTE {i}" for i in range(2_000)], n),
+        "linea_producto": rng.choice([f"LINEA {i}" for i in range(25)], n),
+        "valor_usd": rng.gamma(2.0, 500.0, n).round(2),
+    })
+    # Celdas vacías en columnas de texto y numéricas (el viaje por Arrow no debe cambiar cómo llegan)
+    df.loc[rng.choice(n, n // 100, replace=False), "cliente"] = np.nan
+    df.loc[rng.choice(n, n // 100, replace=False), "valor_usd"] = np.nan
+    return df
+
+
+def generar_libro(ruta, hojas, filas, semilla):
+    with pd.ExcelWriter(ruta, engine="openpyxl") as escritor:
+        for j in range(hojas):
+            generar_hoja(filas, semilla * 100 + j).to_excel(escritor, sheet_name=f"HOJA {j + 1}", index=False)
+
+
+def medir(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+
+# 🛠️ FUNCIÓN: Con arrow=False el pool debe entregar exactamente los mismos frames que el lector en serie
+#   (mismos dtypes y mismos vacíos: NaN y None son distintos al convertir a categoría)
+def verificar_identicos(leidos, referencia):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)  # pandas avisa (y a futuro falla) si mezcla NaN con None
+        for leidas, ref in zip(leidos, referencia):
+            for hoja in ref:
+                pd.testing.assert_frame_equal(leidas[hoja], ref[hoja], obj=f"Hoja {hoja!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libros", type=int, default=2)
+    parser.add_argument("--hojas", type=int, default=4)
+    parser.add_argument("--filas", type=int, default=50_000, help="Filas por hoja")
+    parser.add_argument("--procesos", type=int, nargs="+",
+                        default=sorted({1, 2, 4, lectura_paralela.nucleos()}))
+    parser.add_argument("--motor", default=lector_excel.MOTOR_AUTO)
+    args = parser.parse_args()
+
+    print(f"Núcleos disponibles: {lectura_paralela.nucleos()} · motores: {lector_excel.motores_disponibles()}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        inicio = time.perf_counter()
+        libros = []
+        for i in range(args.libros):
+            ruta = os.path.join(carpeta, f"sucursal_{i + 1}.xlsx")
+            generar_libro(ruta, args.hojas, args.filas, i)
+            with open(ruta, "rb") as f:
+                libros.append((io.BytesIO(f.read()), [f"HOJA {j + 1}" for j in range(args.hojas)]))
+        print(f"{args.libros} libros × {args.hojas} hojas × {args.filas:,} filas generados en "
+              f"{time.perf_counter() - inicio:.1f}s\n")
+
+        t_serie, referencia = medir(
+            lambda: [lector_excel.leer_hojas(fuente, hojas, motor=args.motor) for fuente, hojas in libros]
+        )
+        filas_totales = sum(len(df) for leidas in referencia for df in leidas.values())
+        print(f"{'configuración':>28} {'segundos':>9} {'filas/s':>12} {'speedup':>8}")
+        print(f"{'serie (lector_excel)':>28} {t_serie:>9.2f} {filas_totales / t_serie:>12,.0f} {'1.0x':>8}")
+
+        for procesos in args.procesos:
+            if procesos > 1:
+                # Arranque del pool fuera de la medición: en la app el pool vive lo que vive el servidor
+                t_arranque, _ = medir(lectura_paralela.leer_libros, libros[:1], motor=args.motor, procesos=procesos)
+                print(f"{f'(arranque pool {procesos} procesos)':>28} {t_arranque:>9.2f}")
+            for arrow in (True, False):
+                t, leidos = medir(lectura_paralela.leer_libros, libros, motor=args.motor, procesos=procesos,
+                                  arrow=arrow)
+                if arrow:
+                    assert all(
+                        leidas[h].shape == ref[h].shape for leidas, ref in zip(leidos, referencia) for h in ref
+                    ), "Las hojas leídas no coinciden"
+                else:
+                    verificar_identicos(leidos, referencia)
+                etiqueta = f"{procesos} procesos ({'ArrowDtype' if arrow else 'NumPy'})"
+                print(f"{etiqueta:>28} {t:>9.2f} {filas_totales / t:>12,.0f} {t_serie / t:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
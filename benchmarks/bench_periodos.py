@@ -0,0 +1,78 @@
+# 📏 Benchmark: periodo_id por fila con df.apply (versión anterior) vs. motor vectorizado utils/periodos
+#
+# Uso (desde la raíz del repo):
+#   python -m benchmarks.bench_periodos
+#   python -m benchmarks.bench_periodos --filas 100000 1000000 --max-filas-apply 1000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import periodos
+
+
+def generar_datos(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    dias = rng.integers(0, 365 * 8, n)
+    return pd.DataFrame({"fecha": pd.Timestamp("2018-01-01") + pd.to_timedelta(dias, unit="D")})
+
+
+# Implementación previa de heatmap_ventas.run (una llamada Python por fila)
+def periodo_etiqueta_apply(df, periodo_tipo):
+    df = df.copy()
+    df['mes_anio'] = df['fecha'].dt.strftime('%b-%Y')
+    df['anio'] = df['fecha'].dt.year
+    df['trimestre'] = df['fecha'].dt.to_period('Q').astype(str)
+
+    def generar_periodo_id(row, periodo_tipo):
+        year_short = str(row['anio'])[-2:]
+        month_num = row['fecha'].month
+        trimestre = (month_num - 1) // 3 + 1
+        if periodo_tipo == "Mensual":
+            return f"{year_short}.{month_num:02d}"
+        elif periodo_tipo == "Trimestral":
+            return f"{year_short}.Q{trimestre}"
+        elif periodo_tipo == "Anual":
+            return f"{year_short}"
+        return f"{year_short}.{month_num:02d}"
+
+    df['periodo_id'] = df.apply(lambda row: generar_periodo_id(row, periodo_tipo), axis=1)
+    periodo = {"Mensual": df['mes_anio'], "Trimestral": df['trimestre'], "Anual": df['anio'].astype(str)}[periodo_tipo]
+    return df['periodo_id'] + " - " + periodo
+
+
+def periodo_etiqueta_vectorizado(df, periodo_tipo):
+    codigos, tabla = periodos.periodos(df['fecha'], periodo_tipo)
+    # Sólo para comparar: expandir etiquetas a nivel fila (el módulo trabaja con los códigos)
+    return pd.Series(tabla['periodo_etiqueta'].to_numpy()[np.searchsorted(tabla.index.to_numpy(), codigos)])
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--max-filas-apply", type=int, default=5_000_000,
+                        help="Omitir la versión con df.apply por encima de este tamaño")
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} {'periodo':>11} {'apply (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for n in args.filas:
+        df = generar_datos(n)
+        for periodo_tipo in ["Mensual", "Trimestral", "Anual"]:
+            t_vec, vec = medir(periodo_etiqueta_vectorizado, df, periodo_tipo)
+            if n <= args.max_filas_apply:
+                t_apply, orig = medir(periodo_etiqueta_apply, df, periodo_tipo)
+                assert (orig.to_numpy() == vec.to_numpy()).all(), "Las etiquetas no coinciden"
+                print(f"{n:>10,} {periodo_tipo:>11} {t_apply:>10.2f} {t_vec:>11.3f} {t_apply / t_vec:>7.0f}x")
+            else:
+                print(f"{n:>10,} {periodo_tipo:>11} {'-':>10} {t_vec:>11.3f} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
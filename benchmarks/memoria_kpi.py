@@ -0,0 +1,81 @@
+# 🧠 Reporte de memoria: asignaciones por rerun de KPIs Generales antes (copia completa + to_datetime + map)
+#    y después (vista de sólo lectura sobre columnas derivadas en la ingesta), medido con tracemalloc
+#
+# Uso (desde la raíz del repo):
+#   python -m benchmarks.memoria_kpi
+#   python -m benchmarks.memoria_kpi --filas 500000 2000000
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils import derivadas, tipo_cambio, tipos
+
+
+def generar_datos(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "fecha": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 365 * 8, n), unit="D"),
+        "agente": rng.choice([f"AGENTE {i}" for i in range(40)], n),
+        "linea_producto": rng.choice([f"LINEA {i}" for i in range(25)], n),
+        "cliente": rng.choice([f"CLIENTE {i}" for i in range(5000)], n),
+        "valor_usd": rng.gamma(2.0, 500.0, n),
+    })
+    df, _ = tipos.aplicar_tipos(df)
+    return df
+
+
+# Implementación previa de main_kpi.run (parte de datos, sin Streamlit)
+def rerun_anterior(df_sesion):
+    tipos_cambio = {
+        2018: 19.24, 2019: 19.26, 2020: 21.49, 2021: 20.28,
+        2022: 20.13, 2023: 17.81, 2024: 18.325, 2025: 20.00
+    }
+    df = df_sesion.copy()
+    df["anio"] = pd.to_datetime(df["fecha"], errors="coerce").dt.year
+    df["tipo_cambio"] = df["anio"].map(tipos_cambio).fillna(17.0)
+    df["valor_mn_calc"] = df["valor_usd"] * df["tipo_cambio"]
+    df["agente"] = df["agente"]
+    return df["valor_usd"].sum(), df["valor_mn_calc"].sum(), len(df)
+
+
+# Implementación actual: las derivadas ya están en el frame de la sesión
+def rerun_actual(df_sesion):
+    df = df_sesion
+    columna_usd = derivadas.columna_usd(df)
+    return df[columna_usd].sum(), df["valor_mn_calc"].sum(), len(df)
+
+
+def medir(funcion, df):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultado = funcion(df)
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, segundos, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[100_000, 1_000_000, 2_000_000])
+    args = parser.parse_args()
+
+    tabla = tipo_cambio._leer_tabla(tipo_cambio.ruta_tabla())
+    print(f"{'filas':>10} {'frame MB':>9} {'antes MB':>9} {'después MB':>11} {'antes s':>8} {'después s':>10}")
+    for n in args.filas:
+        df = generar_datos(n)
+        base = df.copy()
+
+        derivadas.agregar_derivadas(df, tabla)
+        r_antes, s_antes, mb_antes = medir(rerun_anterior, base)
+        r_despues, s_despues, mb_despues = medir(rerun_actual, df)
+
+        assert np.isclose(r_antes[0], r_despues[0]) and np.isclose(r_antes[1], r_despues[1]), "Totales distintos"
+        print(f"{n:>10,} {tipos.memoria_mb(base):>9.1f} {mb_antes:>9.1f} {mb_despues:>11.2f} {s_antes:>8.3f} {s_despues:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
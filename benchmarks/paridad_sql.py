@@ -0,0 +1,134 @@
+# 🧮 Paridad y tiempos: agregaciones en pandas vs. motor SQL embebido (DuckDB si está instalado, SQLite)
+#
+# Es la verificación de paridad del motor SQL: termina con error si algún resultado difiere de pandas.
+# Correrla al tocar utils/motor_sql.py, utils/cubo_ventas.py o utils/agregados.py.
+#
+# Uso (desde la raíz del repo):
+#   python -m benchmarks.paridad_sql --filas 20000            (verificación rápida)
+#   python -m benchmarks.paridad_sql --filas 200000 2000000   (paridad + tiempos)
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import agregados, cubo_ventas, derivadas, memo, motor_sql, tipo_cambio, tipos
+
+
+def generar_datos(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "fecha": pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 365 * 8, n), unit="D"),
+        "agente": rng.choice([f"AGENTE {i}" for i in range(40)], n),
+        "linea_producto": rng.choice([f"LINEA {i}" for i in range(25)], n),
+        "valor_usd": rng.gamma(2.0, 500.0, n),
+    })
+    # Casos borde: fechas vacías, importes vacíos y líneas vacías
+    df.loc[rng.choice(n, n // 1000, replace=False), "fecha"] = pd.NaT
+    df.loc[rng.choice(n, n // 1000, replace=False), "valor_usd"] = np.nan
+    df.loc[rng.choice(n, n // 1000, replace=False), "linea_producto"] = np.nan
+    df, _ = tipos.aplicar_tipos(df)
+    derivadas.agregar_derivadas(df, tipo_cambio._leer_tabla(tipo_cambio.ruta_tabla()))
+    return df
+
+
+# Versión pandas de main_comparativo (año / mes derivados de 'fecha')
+def anio_mes_pandas(df):
+    base = pd.DataFrame({
+        "año": df["fecha"].dt.year, "mes": df["fecha"].dt.month, "valor_usd": df["valor_usd"].fillna(0)
+    })
+    return base.groupby(["año", "mes"], as_index=False)["valor_usd"].sum()
+
+
+def _iguales(a, b):
+    if isinstance(a, pd.DataFrame):
+        if a.shape != b.shape:
+            return False
+        etiquetas = (
+            list(map(str, a.columns)) == list(map(str, b.columns))
+            and list(map(str, a.index)) == list(map(str, b.index))
+        )
+        numericas = a.select_dtypes("number").columns
+        textos = [c for c in a.columns if c not in numericas]
+        return (
+            etiquetas
+            and np.allclose(a[numericas].to_numpy(dtype=float), b[numericas].to_numpy(dtype=float))
+            and all((a[c].astype(str).to_numpy() == b[c].astype(str).to_numpy()).all() for c in textos)
+        )
+    return a == b
+
+
+def medir(funcion):
+    t0 = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - t0
+
+
+CASOS = {
+    "cubo_mensual": lambda df, m: cubo_ventas.cubo_mensual(df, "linea_producto", "valor_usd", m),
+    "cubo_diario": lambda df, m: cubo_ventas.cubo_diario(df, "linea_producto", "valor_usd", m),
+    "anio_mes": lambda df, m: (
+        anio_mes_pandas(df) if m == motor_sql.MOTOR_PANDAS else motor_sql.ventas_anio_mes(df, "valor_usd", m)
+    ),
+    "ranking": lambda df, m: agregados.vistas_kpi(agregados.cubo_kpi(df, "valor_usd", m), {})["ranking"],
+}
+
+
+# 🛠️ FUNCIÓN: Cada caso debe dar lo mismo con pandas y con cada motor SQL (1ª consulta y repetida)
+def verificar_paridad(df, motores):
+    tiempos = []
+    for caso, funcion in CASOS.items():
+        esperado, t_pandas = medir(lambda: funcion(df, motor_sql.MOTOR_PANDAS))
+        for motor in motores:
+            # 1ª vez incluye cargar la tabla en el motor; la repetida sólo consulta
+            primero, t_carga = medir(lambda: funcion(df, motor))
+            repetido, t_consulta = medir(lambda: funcion(df, motor))
+            assert _iguales(esperado, primero), f"{caso} con {motor} no coincide con pandas (1ª consulta)"
+            assert _iguales(esperado, repetido), f"{caso} con {motor} no coincide con pandas (repetida)"
+            tiempos.append((caso, motor, t_pandas, t_carga, t_consulta))
+    return tiempos
+
+
+# 🛠️ FUNCIÓN: Una tabla expulsada por cargas de otros datasets se vuelve a cargar al consultarla
+#   Cada dataset lleva sus propios artefactos memorizados, como en la app al cambiar de archivo
+def verificar_expulsion(motores, filas=2_000):
+    datasets = [(generar_datos(filas, semilla=i), {}) for i in range(motor_sql.MAX_TABLAS + 2)]
+
+    def anio_mes(df, artefactos, motor):
+        st.session_state[memo.CLAVE_ARTEFACTOS] = artefactos
+        return motor_sql.ventas_anio_mes(df, "valor_usd", motor)
+
+    for motor in motores:
+        primero, artefactos = datasets[0]
+        esperado = anio_mes_pandas(primero)
+        assert _iguales(esperado, anio_mes(primero, artefactos, motor))
+        for df, otros in datasets[1:]:
+            anio_mes(df, otros, motor)
+        assert _iguales(esperado, anio_mes(primero, artefactos, motor)), (
+            f"La tabla expulsada de {motor} no se volvió a cargar"
+        )
+    st.session_state.pop(memo.CLAVE_ARTEFACTOS, None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[200_000, 2_000_000])
+    args = parser.parse_args()
+
+    motor_sql.DIRECTORIO_SQL = tempfile.mkdtemp(prefix="fradma_sql_")
+    motores = [m for m in motor_sql.motores_disponibles() if m != motor_sql.MOTOR_PANDAS]
+
+    verificar_expulsion(motores)
+    print(f"Expulsión y recarga de tablas ({', '.join(motores)}): OK\n")
+
+    print(f"{'filas':>10} {'caso':>13} {'motor':>7} {'pandas s':>9} {'1ª vez s':>9} {'repetida s':>11}")
+    for n in args.filas:
+        for caso, motor, t_pandas, t_carga, t_consulta in verificar_paridad(generar_datos(n), motores):
+            print(f"{n:>10,} {caso:>13} {motor:>7} {t_pandas:>9.3f} {t_carga:>9.3f} {t_consulta:>11.3f}")
+    print("\nParidad pandas / SQL: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,49 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from unidecode import unidecode
-from datetime import datetime
 import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
+from utils import antiguedad, cache_ingesta, calculos, formato, lector_excel, memo
 
-def normalizar_columnas(df):
-    nuevas_columnas = []
-    contador = {}
-    for col in df.columns:
-        col_str = str(col).lower().strip().replace(" ", "_")
-        col_str = unidecode(col_str)
-        
-        if col_str in contador:
-            contador[col_str] += 1
-            col_str = f"{col_str}_{contador[col_str]}"
-        else:
-            contador[col_str] = 1
-            
-        nuevas_columnas.append(col_str)
-    df.columns = nuevas_columnas
-    return df
+HOJAS_CXC = calculos.HOJAS_CXC
+
+# 🛠️ FUNCIÓN: Hojas CxC del libro (una sola apertura) cuando app.py no las precargó
+def leer_hojas_cxc(archivo):
+    contenido = archivo.getvalue()
+    hojas = lector_excel.nombres_hojas(contenido)
+    motor = st.session_state.get("motor_excel", lector_excel.MOTOR_AUTO)
+    return lector_excel.leer_hojas(contenido, [h for h in HOJAS_CXC if h in hojas], motor=motor)
 
-def run(archivo):
+def run(archivo, hojas_cxc=None):
     if not archivo.name.endswith(('.xls', '.xlsx')):
         st.error("❌ Solo se aceptan archivos Excel para el reporte de deudas.")
         return
 
     try:
-        xls = pd.ExcelFile(archivo)
-        hojas = xls.sheet_names
+        # Todo lo que no depende de la fecha de corte se construye una vez por libro (huella del archivo),
+        # compartido entre las sesiones que suben el mismo libro
+        huella = cache_ingesta.huella_archivo(archivo)
+
+        # Sin hojas precargadas por app.py: leerlas aquí en una sola apertura del libro
+        if hojas_cxc is None:
+            hojas_cxc = memo.memo_compartido("hojas_cxc", lambda: leer_hojas_cxc(archivo), huella, max_entradas=4)
         
-        if "CXC VIGENTES" not in hojas or "CXC VENCIDAS" not in hojas:
-            st.error("❌ No se encontraron las hojas requeridas: 'CXC VIGENTES' y 'CXC VENCIDAS'.")
+        # Modelo de cartera (hojas unificadas, saldos y vencimientos parseados, índice por deudor) una vez por libro
+        try:
+            modelo = memo.memo_compartido(
+                "modelo_cxc", lambda: calculos.modelo_cartera(hojas_cxc), huella, max_entradas=4
+            )
+        except ValueError as e:
+            st.error(str(e))
             return
 
         st.info("✅ Fuente: Hojas 'CXC VIGENTES' y 'CXC VENCIDAS'")
 
-        # Leer y normalizar datos
-        df_vigentes = pd.read_excel(xls, sheet_name='CXC VIGENTES')
-        df_vencidas = pd.read_excel(xls, sheet_name='CXC VENCIDAS')
-        
-        df_vigentes = normalizar_columnas(df_vigentes)
-        df_vencidas = normalizar_columnas(df_vencidas)
-        
-        # Renombrar columnas clave - PRIORIZAR COLUMNA F (CLIENTE)
-        for df in [df_vigentes, df_vencidas]:
-            # 1. Priorizar columna 'cliente' (columna F)
-            if 'cliente' in df.columns:
-                df.rename(columns={'cliente': 'deudor'}, inplace=True)
-                
-                # Si también existe 'razon_social', eliminarla
-                if 'razon_social' in df.columns:
-                    df.drop(columns=['razon_social'], inplace=True)
-                    
-            # 2. Si no existe 'cliente', usar 'razon_social' como respaldo
-            elif 'razon_social' in df.columns:
-                df.rename(columns={'razon_social': 'deudor'}, inplace=True)
-            
-            # Renombrar otras columnas importantes
-            column_rename = {
-                'linea_de_negocio': 'linea_negocio',
-                'vendedor': 'vendedor',
-                'saldo': 'saldo_adeudado',
-                'saldo_usd': 'saldo_adeudado',
-                'estatus': 'estatus',
-                'vencimiento': 'fecha_vencimiento'
-            }
-            
-            for original, nuevo in column_rename.items():
-                if original in df.columns and nuevo not in df.columns:
-                    df.rename(columns={original: nuevo}, inplace=True)
-        
-        # Agregar origen
-        df_vigentes['origen'] = 'VIGENTE'
-        df_vencidas['origen'] = 'VENCIDA'
-        
-        # Unificar columnas
-        common_cols = list(set(df_vigentes.columns) & set(df_vencidas.columns))
-        df_deudas = pd.concat([
-            df_vigentes[common_cols], 
-            df_vencidas[common_cols]
-        ], ignore_index=True)
-        
-        # Limpieza
-        df_deudas = df_deudas.dropna(axis=1, how='all')
-        
-        # Manejar duplicados
-        duplicados = df_deudas.columns[df_deudas.columns.duplicated()]
-        if not duplicados.empty:
-            df_deudas = df_deudas.loc[:, ~df_deudas.columns.duplicated(keep='first')]
-
-        # Validar columna clave
-        if 'saldo_adeudado' not in df_deudas.columns:
-            st.error("❌ No existe columna de saldo en los datos.")
-            st.write("Columnas disponibles:", df_deudas.columns.tolist())
-            return
-            
-        # Validar columna de deudor
-        if 'deudor' not in df_deudas.columns:
-            st.error("❌ No se encontró columna para identificar deudores.")
-            st.write("Se esperaba 'cliente' o 'razon_social' en los encabezados")
-            return
-            
-        # Convertir saldo
-        saldo_serie = df_deudas['saldo_adeudado'].astype(str)
-        saldo_limpio = saldo_serie.str.replace(r'[^\d.]', '', regex=True)
-        df_deudas['saldo_adeudado'] = pd.to_numeric(saldo_limpio, errors='coerce').fillna(0)
+        # Antigüedad a una fecha de corte explícita: reproducible y memorizada por (libro, fecha)
+        fecha_corte = pd.Timestamp(st.date_input("📅 Fecha de corte", value=pd.Timestamp.today().date()))
+        reporte = memo.memo_compartido(
+            "reporte_cxc", lambda: calculos.reporte_cartera(modelo, fecha_corte), (huella, fecha_corte), max_entradas=16
+        )
+        analisis = reporte['analisis']
 
         # ---------------------------------------------------------------------
         # REPORTE DE DEUDAS A FRADMA (USANDO COLUMNA CORRECTA)
@@ -115,23 +51,20 @@ def run(archivo):
         st.header("📊 Reporte de Deudas a Fradma")
         
         # KPIs principales
-        total_adeudado = df_deudas['saldo_adeudado'].sum()
+        total_adeudado = reporte['total']
         col1, col2 = st.columns(2)
         col1.metric("Total Adeudado a Fradma", f"${total_adeudado:,.2f}")
         
-        # Calcular vencimientos
-        try:
-            mask_vencida = df_deudas['estatus'].str.contains('VENCID', na=False)
-            vencida = df_deudas[mask_vencida]['saldo_adeudado'].sum()
+        # Deuda vencida según 'estatus' (sin esa columna, o sin saldo total, no se muestra)
+        vencida = reporte['vencida']
+        if vencida is not None and total_adeudado:
             col2.metric("Deuda Vencida", f"${vencida:,.2f}", 
                        delta=f"{(vencida/total_adeudado*100):.1f}%",
                        delta_color="inverse")
-        except:
-            vencida = 0
 
         # Top 5 deudores (USANDO COLUMNA F - CLIENTE)
         st.subheader("🔝 Principales Deudores (Columna Cliente)")
-        top_deudores = df_deudas.groupby('deudor')['saldo_adeudado'].sum().nlargest(5)
+        top_deudores = reporte['top_deudores']
         st.dataframe(top_deudores.reset_index().rename(
             columns={'deudor': 'Cliente (Col F)', 'saldo_adeudado': 'Monto Adeudado ($)'}
         ).style.format({'Monto Adeudado ($)': '${:,.2f}'}))
@@ -141,37 +74,12 @@ def run(archivo):
 
         # Análisis de riesgo por antigüedad
         st.subheader("📅 Perfil de Riesgo por Antigüedad")
-        if 'fecha_vencimiento' in df_deudas.columns:
+        if 'riesgo' in analisis:
             try:
-                df_deudas['fecha_vencimiento'] = pd.to_datetime(
-                    df_deudas['fecha_vencimiento'], errors='coerce', dayfirst=True
-                )
-                
-                hoy = pd.Timestamp.today()
-                df_deudas['dias_vencido'] = (hoy - df_deudas['fecha_vencimiento']).dt.days
-                
-                # Clasificación de riesgo con colores
-                bins = [-np.inf, 0, 30, 60, 90, 180, np.inf]
-                labels = ['Por vencer', 
-                         '1-30 días', 
-                         '31-60 días', 
-                         '61-90 días', 
-                         '91-180 días', 
-                         '>180 días']
-                colores = ['#4CAF50', '#8BC34A', '#FFEB3B', '#FF9800', '#F44336', '#B71C1C']  # Verde, verde claro, amarillo, naranja, rojo, rojo oscuro
-                
-                df_deudas['nivel_riesgo'] = pd.cut(
-                    df_deudas['dias_vencido'], 
-                    bins=bins, 
-                    labels=labels
-                )
-                
-                # Resumen de riesgo
-                riesgo_df = df_deudas.groupby('nivel_riesgo')['saldo_adeudado'].sum().reset_index()
-                riesgo_df['porcentaje'] = (riesgo_df['saldo_adeudado'] / total_adeudado) * 100
-                
-                # Ordenar por nivel de riesgo
-                riesgo_df = riesgo_df.sort_values('nivel_riesgo')
+                colores = antiguedad.ESQUEMAS['riesgo']['colores']
+
+                # Resumen de riesgo (todos los tramos, ordenados por nivel)
+                riesgo_df = analisis['riesgo']
                 
                 # Mostrar semáforo visual
                 st.write("### 🔴🟠🟡🟢 Semáforo de Riesgo")
@@ -226,34 +134,14 @@ def run(archivo):
         # =====================================================================
         st.subheader("👤 Distribución de Deuda por Agente")
         
-        if 'vendedor' in df_deudas.columns:
-            # Asegurar que tenemos los días vencidos calculados
-            if 'dias_vencido' not in df_deudas.columns and 'fecha_vencimiento' in df_deudas.columns:
-                try:
-                    hoy = pd.Timestamp.today()
-                    df_deudas['dias_vencido'] = (hoy - pd.to_datetime(df_deudas['fecha_vencimiento'], errors='coerce')).dt.days
-                except:
-                    pass
-            
-            if 'dias_vencido' in df_deudas.columns:
-                # Definir categorías y colores para agentes
-                bins_agentes = [-np.inf, 0, 30, 60, 90, np.inf]
-                labels_agentes = ['Por vencer', '1-30 días', '31-60 días', '61-90 días', '>90 días']
-                colores_agentes = ['#4CAF50', '#8BC34A', '#FFEB3B', '#FF9800', '#F44336']  # Verde, verde claro, amarillo, naranja, rojo
-                
-                # Clasificar la deuda de los agentes
-                df_deudas['categoria_agente'] = pd.cut(
-                    df_deudas['dias_vencido'], 
-                    bins=bins_agentes, 
-                    labels=labels_agentes
-                )
-                
-                # Agrupar por agente y categoría
-                agente_categoria = df_deudas.groupby(['vendedor', 'categoria_agente'])['saldo_adeudado'].sum().unstack().fillna(0)
+        if 'vendedor' in modelo['deudas'].columns:
+            if reporte['agente_tramo'] is not None:
+                # Categorías y colores para agentes
+                labels_agentes = antiguedad.ESQUEMAS['agentes']['etiquetas']
+                colores_agentes = antiguedad.ESQUEMAS['agentes']['colores']
                 
-                # Ordenar por el total de deuda
-                agente_categoria['Total'] = agente_categoria.sum(axis=1)
-                agente_categoria = agente_categoria.sort_values('Total', ascending=False)
+                # Deuda por agente y categoría con su total, ordenada por el total (ya agregada en calculos)
+                agente_categoria = reporte['agente_tramo']
                 
                 # Crear gráfico de barras apiladas
                 st.write("### 📊 Distribución por Agente y Antigüedad")
@@ -282,11 +170,11 @@ def run(archivo):
                 resumen_agente = agente_categoria.copy()
                 resumen_agente = resumen_agente.sort_values('Total', ascending=False)
                 
-                # Formatear valores
+                # Formatear valores (vectorizado; categorías sin deuda quedan vacías)
                 for col in resumen_agente.columns:
                     if col != 'Total':
-                        resumen_agente[col] = resumen_agente[col].apply(lambda x: f"${x:,.2f}" if x > 0 else "")
-                resumen_agente['Total'] = resumen_agente['Total'].apply(lambda x: f"${x:,.2f}")
+                        resumen_agente[col] = formato.formato_moneda(resumen_agente[col].where(resumen_agente[col] > 0))
+                resumen_agente['Total'] = formato.formato_moneda(resumen_agente['Total'])
                 
                 st.dataframe(resumen_agente)
                 
@@ -297,11 +185,11 @@ def run(archivo):
 
         # Desglose detallado por deudor (CLIENTE - COLUMNA F)
         st.subheader("🔍 Detalle Completo por Deudor (Columna Cliente)")
-        deudores = df_deudas['deudor'].unique().tolist()
+        deudores = modelo['deudores']
         selected_deudor = st.selectbox("Seleccionar Deudor", deudores)
         
-        # Filtrar datos
-        deudor_df = df_deudas[df_deudas['deudor'] == selected_deudor]
+        # Documentos del deudor por índice (ya ordenados por vencimiento, sin filtrar todo el frame)
+        deudor_df = calculos.detalle_deudor(modelo, analisis, selected_deudor)
         total_deudor = deudor_df['saldo_adeudado'].sum()
         
         st.metric(f"Total Adeudado por {selected_deudor}", f"${total_deudor:,.2f}")
@@ -310,15 +198,15 @@ def run(archivo):
         st.write("**Documentos pendientes:**")
         cols = ['fecha_vencimiento', 'saldo_adeudado', 'estatus', 'dias_vencido'] 
         cols = [c for c in cols if c in deudor_df.columns]
-        st.dataframe(deudor_df[cols].sort_values('fecha_vencimiento', ascending=False))
+        st.dataframe(deudor_df[cols])
 
         # Resumen ejecutivo
         st.subheader("📝 Resumen Ejecutivo")
         st.write(f"Fradma tiene **${total_adeudado:,.2f}** en deudas pendientes de cobro")
         st.write(f"El principal deudor es **{top_deudores.index[0]}** con **${top_deudores.iloc[0]:,.2f}**")
         
-        if 'dias_vencido' in df_deudas.columns:
-            deuda_vencida = df_deudas[df_deudas['dias_vencido'] > 0]['saldo_adeudado'].sum()
+        if 'dias_vencido' in analisis:
+            deuda_vencida = analisis['vencida_dias']
             st.write(f"- **${deuda_vencida:,.2f} en deuda vencida**")
         
         st.write("Este reporte se basa en la columna 'Cliente' (F) para identificar deudores.")
@@ -1,55 +1,31 @@
-
 import streamlit as st
-import pandas as pd
 import altair as alt
+from utils import calculos, memo, motor_sql
 
 
 def run(df, año_base=None):
     st.title("Comparativo de Ventas por Mes y Año")
 
-    df.columns = df.columns.str.lower().str.strip()
-
-    # Asegurar compatibilidad: valor_usd = importe o ventas_usd
-    if "valor_usd" not in df.columns:
-        if "valor usd" in df.columns:
-            df = df.rename(columns={"valor usd": "valor_usd"})
-        elif "ventas_usd" in df.columns:
-            df = df.rename(columns={"ventas_usd": "valor_usd"})
-        elif "importe" in df.columns:
-            df = df.rename(columns={"importe": "valor_usd"})
-
-    if "valor_usd" not in df.columns:
-        st.error("No se encontró la columna 'valor_usd', 'valor usd', 'ventas_usd' ni 'importe'.")
+    # Columnas resueltas por el registro de alias, sin tocar el frame compartido de la sesión
+    try:
+        columna_valor, _ = calculos.columnas_comparativo(df)
+    except ValueError as e:
+        st.error(str(e))
         return
 
-    
-        df = df.rename(columns={"aã±o": "año"})
-
-    if "fecha" in df.columns and ("año" not in df.columns or "mes" not in df.columns):
-        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
-        df["año"] = df["fecha"].dt.year
-        df["mes"] = df["fecha"].dt.month
-
-    df["valor_usd"] = pd.to_numeric(df["valor_usd"], errors="coerce").fillna(0)
-
-    # Agrupar y pivotear
-    pivot_ventas = df.groupby(["año", "mes"], as_index=False)["valor_usd"].sum()
-    tabla_fija = pivot_ventas.pivot(index="año", columns="mes", values="valor_usd").fillna(0)
-
-    for mes in range(1, 13):
-        if mes not in tabla_fija.columns:
-            tabla_fija[mes] = 0
-    tabla_fija = tabla_fija[sorted(tabla_fija.columns)]
+    # Matriz año × 12 construida una vez por dataset; tabla, gráfico y comparativo la leen por fila
+    motor = motor_sql.motor_activo()
+    ventas = memo.memo_dataset(
+        "ventas_anio_mes",
+        lambda: calculos.ventas_anio_mes(df, motor),
+        columna_valor, motor
+    )
 
     st.subheader("Ventas por Mes y Año (Tabla)")
-    st.dataframe(tabla_fija, use_container_width=True)
-
-    # Gráfico anual
-    df_chart = tabla_fija.reset_index().melt(id_vars="año", var_name="mes", value_name="valor_usd")
-    df_chart["mes"] = df_chart["mes"].astype(int)
+    st.dataframe(ventas["tabla"], use_container_width=True)
 
     st.subheader("Gráfico de Ventas por Año")
-    chart = alt.Chart(df_chart).mark_line(point=True).encode(
+    chart = alt.Chart(ventas["largo"]).mark_line(point=True).encode(
         x=alt.X("mes:O", title="Mes"),
         y=alt.Y("valor_usd:Q", title="Ventas USD"),
         color="año:N",
@@ -61,7 +37,7 @@ def run(df, año_base=None):
     # Comparativo Año vs Año
     st.subheader("📊 Comparativo Año vs Año")
 
-    anios_disponibles = sorted(df["año"].dropna().unique())
+    anios_disponibles = list(ventas["anios"])
     if len(anios_disponibles) >= 2:
         default_index_1 = anios_disponibles.index(año_base) if año_base in anios_disponibles else 0
         default_index_2 = default_index_1 + 1 if default_index_1 + 1 < len(anios_disponibles) else 0
@@ -69,21 +45,8 @@ def run(df, año_base=None):
         anio_1 = st.selectbox("Selecciona el primer año", anios_disponibles, index=default_index_1)
         anio_2 = st.selectbox("Selecciona el segundo año", anios_disponibles, index=default_index_2)
 
-        df_y1 = pivot_ventas[pivot_ventas["año"] == anio_1].set_index("mes")["valor_usd"]
-        df_y2 = pivot_ventas[pivot_ventas["año"] == anio_2].set_index("mes")["valor_usd"]
-
-        comparativo = pd.DataFrame({
-            f"{anio_1}": df_y1,
-            f"{anio_2}": df_y2
-        }).fillna(0)
-
-        comparativo[f"{anio_1}"] = pd.to_numeric(comparativo[f"{anio_1}"], errors="coerce").fillna(0)
-        comparativo[f"{anio_2}"] = pd.to_numeric(comparativo[f"{anio_2}"], errors="coerce").fillna(0)
-
-        comparativo["Diferencia"] = comparativo[f"{anio_2}"] - comparativo[f"{anio_1}"]
-        comparativo["% Variación"] = (
-            (comparativo["Diferencia"] / comparativo[f"{anio_1}"].replace(0, pd.NA)) * 100
-        ).round(2)
+        # Búsqueda directa por fila de la matriz; sólo meses con ventas en alguno de los dos años
+        comparativo = calculos.comparativo_anios(ventas, anio_1, anio_2)
 
         st.dataframe(comparativo)
 
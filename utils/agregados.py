@@ -0,0 +1,62 @@
+import numpy as np
+
+from utils import formato, motor_sql
+
+# Servicio de agregación para KPIs: un cubo (agente, anio, línea) por dataset y, sobre él,
+# las vistas de ranking y gráficos por combinación de filtros (memo LRU junto al dataset)
+MAX_VISTAS = 8
+
+
+# 🛠️ FUNCIÓN: Cubo base con sumas USD / MN y número de operaciones (una pasada sobre las filas)
+def cubo_kpi(df, columna_usd, motor=motor_sql.MOTOR_PANDAS):
+    if motor != motor_sql.MOTOR_PANDAS:
+        return motor_sql.cubo_kpi(df, columna_usd, motor)
+    claves = ["agente", "anio"] + (["linea_producto"] if "linea_producto" in df.columns else [])
+    return (
+        df.groupby(claves, observed=True, dropna=False, sort=True)
+        .agg(
+            total_usd=(columna_usd, "sum"),
+            total_mn=("valor_mn_calc", "sum"),
+            operaciones=(columna_usd, "count")
+        )
+        .reset_index()
+    )
+
+
+def _filtrar(cubo, filtros):
+    mascara = np.ones(len(cubo), dtype=bool)
+    for columna, valor in filtros.items():
+        mascara &= (cubo[columna] == valor).to_numpy()
+    return cubo[mascara & cubo["agente"].notna().to_numpy()]
+
+
+def _por_agente(tabla, columnas):
+    return tabla.groupby("agente", observed=True)[columnas].sum().reset_index()
+
+
+# 🛠️ FUNCIÓN: Ranking, resumen (agente, anio) y totales por agente para una combinación de filtros
+def vistas_kpi(cubo, filtros):
+    tabla = _filtrar(cubo, filtros)
+
+    ranking = (
+        _por_agente(tabla, ["total_usd", "total_mn", "operaciones"])
+        .sort_values("total_usd", ascending=False)
+        .reset_index(drop=True)
+    )
+    ranking.insert(0, "Ranking", range(1, len(ranking) + 1))
+    ranking["total_usd"] = ranking["total_usd"].round(0)
+    ranking["total_mn"] = ranking["total_mn"].round(0)
+
+    # Para gráficos sólo cuentan filas con año e importe (como el antiguo dropna)
+    con_anio = tabla[tabla["anio"].notna().to_numpy() & (tabla["operaciones"] > 0).to_numpy()]
+    resumen = (
+        con_anio.groupby(["agente", "anio"], observed=True)[["total_usd", "operaciones"]].sum()
+        .reset_index()
+        .rename(columns={"total_usd": "total_ventas"})
+    )
+    resumen["ventas_moneda"] = formato.formato_moneda(resumen["total_ventas"])
+
+    por_agente = _por_agente(resumen, ["total_ventas", "operaciones"])
+    por_agente["ventas_moneda"] = formato.formato_moneda(por_agente["total_ventas"])
+
+    return {"ranking": ranking, "resumen": resumen, "por_agente": por_agente}
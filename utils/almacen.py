@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow es opcional: sin él no hay almacén local
+    pa = None
+    feather = None
+
+try:
+    import fcntl
+except ImportError:  # fcntl sólo existe en POSIX: en otros sistemas el candado cubre sólo este proceso
+    fcntl = None
+
+from utils import ingesta_csv, periodos, tipos
+
+logger = logging.getLogger(__name__)
+
+# Almacén local de ventas: una partición Feather por mes + tabla pre-agregada (mes × agente × línea).
+# Agregar un archivo sólo reescribe los meses que trae, así que el costo es proporcional a ese periodo.
+DIRECTORIO_ALMACEN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "almacen")
+MANIFIESTO = "manifiesto.json"
+AGREGADOS = "agregados.feather"
+
+# Claves de deduplicación: fecha + folio/factura (obligatorias) + importe (si existe)
+COLUMNAS_FOLIO = ["folio", "factura", "no_factura", "num_factura", "uuid"]
+COLUMNAS_IMPORTE_DEDUP = ["importe", "valor_usd", "ventas_usd", "ventas_usd_con_iva", "valor_mn"]
+BLOQUEO = ".bloqueo"
+FOLIOS_VACIOS = {"", "nan", "none", "<na>", "nat"}
+
+# Serializa las escrituras (manifiesto + particiones) entre sesiones; el archivo de bloqueo, entre procesos
+_candado = threading.Lock()
+
+
+def disponible():
+    return pa is not None
+
+
+def _ruta(nombre):
+    return os.path.join(DIRECTORIO_ALMACEN, nombre)
+
+
+def _nombre_particion(codigo):
+    return "ventas_sin_fecha.feather" if codigo == periodos.SIN_PERIODO else f"ventas_{codigo}.feather"
+
+
+# 🛠️ FUNCIÓN: Exclusión mutua del ciclo leer-modificar-escribir del almacén (hilos y procesos)
+@contextmanager
+def _bloqueo():
+    with _candado:
+        os.makedirs(DIRECTORIO_ALMACEN, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(_ruta(BLOQUEO), "a") as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def _temporal(ruta):
+    return f"{ruta}.tmp{os.getpid()}_{threading.get_ident()}"
+
+
+def _escribir_atomico(df, ruta):
+    temporal = _temporal(ruta)
+    feather.write_feather(df.reset_index(drop=True), temporal, compression="uncompressed")
+    os.replace(temporal, ruta)
+
+
+def _leer(ruta):
+    if not os.path.exists(ruta):
+        return None
+    with pa.memory_map(ruta, "r") as fuente:
+        return pa.ipc.open_file(fuente).read_all().to_pandas()
+
+
+# 🛠️ FUNCIÓN: Manifiesto del almacén (generación, revisión, filas por partición y archivos ya ingeridos)
+#   La generación identifica al almacén desde que se creó el manifiesto; la revisión nunca baja (ni al vaciar)
+def manifiesto():
+    ruta = _ruta(MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {"generacion": uuid.uuid4().hex, "revision": 0, "particiones": {}, "archivos": {}}
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_manifiesto(datos):
+    ruta = _ruta(MANIFIESTO)
+    temporal = _temporal(ruta)
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def revision():
+    return manifiesto()["revision"]
+
+
+# 🛠️ FUNCIÓN: Versión del contenido (generación + revisión) para claves de caché compartidas entre sesiones
+def version():
+    datos = manifiesto()
+    return f"{datos.get('generacion', '')}-{datos['revision']}"
+
+
+# 🛠️ FUNCIÓN: Claves de deduplicación del archivo; sin folio/factura no se deduplica (fecha + importe
+#   no distingue dos ventas distintas del mismo día y monto)
+def claves_dedup(df):
+    folio = next((c for c in COLUMNAS_FOLIO if c in df.columns), None)
+    if "fecha" not in df.columns:
+        raise ValueError("El almacén requiere una columna 'fecha'.")
+    if folio is None:
+        raise ValueError(
+            "El almacén requiere una columna de folio o factura para distinguir ventas del mismo día e importe "
+            f"(se buscó: {', '.join(COLUMNAS_FOLIO)})."
+        )
+    importe = next((c for c in COLUMNAS_IMPORTE_DEDUP if c in df.columns), None)
+    return [c for c in ("fecha", folio, importe) if c]
+
+
+# 🛠️ FUNCIÓN: Folios vacíos; aplicar_tipos ya convirtió los faltantes a texto ("nan", "None")
+def _folio_vacio(serie):
+    texto = serie.astype(str).str.strip().str.lower()
+    return (serie.isna() | texto.isin(FOLIOS_VACIOS)).to_numpy()
+
+
+# 🛠️ FUNCIÓN: Hash por fila de las claves de deduplicación (independiente de dtype: texto / entero / category)
+#   Una clave que falta en df (partición con otro esquema) cuenta como vacía: esas filas no coinciden
+def _hash_claves(df, claves):
+    normalizado = pd.DataFrame(index=df.index)
+    for col in claves:
+        serie = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        if col == "fecha":
+            normalizado[col] = pd.to_datetime(serie, errors="coerce").to_numpy(dtype="datetime64[ns]").view("int64")
+        elif col in COLUMNAS_IMPORTE_DEDUP:
+            normalizado[col] = pd.to_numeric(serie, errors="coerce").astype("float64").round(2)
+        elif pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+            # Folios enteros que llegaron como float por tener celdas vacías: 123.0 → "123"
+            normalizado[col] = serie.astype("Int64").astype(str)
+        else:
+            normalizado[col] = serie.astype(str).str.strip()
+    return pd.util.hash_pandas_object(normalizado, index=False).to_numpy()
+
+
+def _agregado_particion(df):
+    claves, importes = ingesta_csv.columnas_agregado(df)
+    return ingesta_csv.combinar_preagregados([ingesta_csv.preagregar(df, claves, importes)], claves, importes)
+
+
+# 🛠️ FUNCIÓN: Agregar ventas normalizadas al almacén (dedup contra lo existente, sólo meses afectados)
+def agregar(df, huella, nombre_archivo):
+    # Mismas claves para el archivo y para las particiones existentes
+    claves = claves_dedup(df)
+    with _bloqueo():
+        return _agregar(df, claves, huella, nombre_archivo)
+
+
+def _agregar(df, claves, huella, nombre_archivo):
+    datos = manifiesto()
+    if huella in datos["archivos"]:
+        return {"ya_ingerido": True, "nuevas": 0, "duplicadas": len(df), "periodos": []}
+
+    # Sólo se omiten filas que ya están en el almacén (dos renglones iguales de una misma factura son
+    # ventas distintas). Las filas sin folio nunca se consideran duplicadas: no hay con qué distinguirlas
+    hashes = _hash_claves(df, claves)
+    con_folio = ~_folio_vacio(df[claves[1]])
+    codigos = periodos.codigos_periodo(df["fecha"], "Mensual")
+    nuevas = duplicadas = 0
+    afectados = []
+    for codigo in np.unique(codigos):
+        del_mes = codigos == codigo
+        repetidas = np.zeros(int(del_mes.sum()), dtype=bool)
+        ruta = _ruta(_nombre_particion(codigo))
+        existentes = _leer(ruta)
+        if existentes is not None:
+            repetidas = np.isin(hashes[del_mes], _hash_claves(existentes, claves)) & con_folio[del_mes]
+        duplicadas += int(repetidas.sum())
+        entrantes = df[del_mes][~repetidas]
+        if entrantes.empty:
+            continue
+
+        particion = tipos.concatenar([existentes, entrantes])
+        _escribir_atomico(particion, ruta)
+        datos["particiones"][str(int(codigo))] = len(particion)
+        nuevas += len(entrantes)
+        afectados.append(int(codigo))
+
+    # Pre-agregados: sólo se recalculan los meses afectados
+    con_fecha = [c for c in afectados if c != periodos.SIN_PERIODO]
+    if con_fecha:
+        agregados = _leer(_ruta(AGREGADOS))
+        if agregados is not None:
+            vigentes = periodos.codigos_periodo(agregados["fecha"], "Mensual")
+            agregados = agregados[~np.isin(vigentes, con_fecha)]
+        recalculados = [_agregado_particion(_leer(_ruta(_nombre_particion(c)))) for c in con_fecha]
+        agregados = tipos.concatenar([agregados, *recalculados]).sort_values("fecha", kind="stable")
+        _escribir_atomico(agregados, _ruta(AGREGADOS))
+
+    datos["archivos"][huella] = {
+        "nombre": nombre_archivo,
+        "ingerido": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "filas_nuevas": nuevas,
+        "filas_duplicadas": duplicadas,
+    }
+    if afectados:
+        datos["revision"] += 1
+    _guardar_manifiesto(datos)
+    return {"ya_ingerido": False, "nuevas": nuevas, "duplicadas": duplicadas, "periodos": afectados}
+
+
+# 🛠️ FUNCIÓN: Dataset completo del almacén (todas las particiones, categorías unificadas)
+def cargar():
+    with _bloqueo():
+        datos = manifiesto()
+        particiones = [_leer(_ruta(_nombre_particion(int(c)))) for c in sorted(datos["particiones"], key=int)]
+    df = tipos.concatenar(particiones)
+    if "fecha" in df.columns:
+        df = df.sort_values("fecha", kind="stable", na_position="last").reset_index(drop=True)
+    return df
+
+
+# 🛠️ FUNCIÓN: Tabla pre-agregada (mes × agente × línea) mantenida incrementalmente
+def cargar_agregados():
+    return _leer(_ruta(AGREGADOS)) if disponible() else None
+
+
+# 🛠️ FUNCIÓN: Borrar el almacén completo (el manifiesto se conserva vacío con una revisión nueva)
+def vaciar():
+    if not os.path.isdir(DIRECTORIO_ALMACEN):
+        return
+    with _bloqueo():
+        datos = manifiesto()
+        for nombre in os.listdir(DIRECTORIO_ALMACEN):
+            if nombre in (BLOQUEO, MANIFIESTO):
+                continue
+            try:
+                os.remove(_ruta(nombre))
+            except OSError as e:
+                logger.warning("No se pudo borrar %s: %s", nombre, e)
+        _guardar_manifiesto({
+            "generacion": datos.get("generacion", ""),
+            "revision": datos["revision"] + 1,
+            "particiones": {},
+            "archivos": {},
+        })
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from utils.formato import formato_moneda
+
+UMBRAL_TEXTO_BLANCO = 0.6
+
+
+# 🛠️ FUNCIÓN: Filtro de importe sobre la tabla completa (celdas fuera de rango → NaN)
+#   Siempre en float64 (como el antiguo applymap), aunque el cubo venga en float32.
+def filtrar_importe(tabla, minimo, maximo):
+    tabla = tabla.astype("float64")
+    return tabla.where((tabla >= minimo) & (tabla <= maximo))
+
+
+# 🛠️ FUNCIÓN: % de crecimiento contra el periodo anterior del mismo grupo (mes, trimestre o año)
+#   Equivale a groupby(grupo).pct_change() * 100: los vacíos se rellenan hacia adelante dentro del grupo.
+def crecimiento(tabla, grupos):
+    grupos = np.asarray(grupos)
+    rellenado = tabla.groupby(grupos).ffill()
+    anterior = rellenado.groupby(grupos).shift(1)
+    return (rellenado / anterior - 1) * 100
+
+
+# 🛠️ FUNCIÓN: Textos de las celdas ("$X" / "$X\n(Y%)" / "NEW") y líneas con ventas nuevas
+def anotaciones(tabla, tabla_crecimiento=None):
+    valores = tabla.to_numpy(dtype=float)
+    moneda = formato_moneda(valores)
+
+    if tabla_crecimiento is None:
+        return pd.DataFrame(moneda, index=tabla.index, columns=tabla.columns), []
+
+    growth = tabla_crecimiento.to_numpy(dtype=float)
+    con_valor = ~np.isnan(valores)
+    con_pct = con_valor & np.isfinite(growth)
+    nuevo = con_valor & np.isinf(growth)
+
+    textos = moneda.copy()
+    pct = np.full(growth.shape, "", dtype=object)
+    pct[con_pct] = [f"({g:.1f}%)" for g in growth[con_pct].tolist()]
+    textos[con_pct] = moneda[con_pct] + "\n" + pct[con_pct]
+    textos[nuevo] = "NEW"
+
+    nuevas_lineas = tabla.columns[nuevo.any(axis=0)].tolist()
+    return pd.DataFrame(textos, index=tabla.index, columns=tabla.columns), nuevas_lineas
+
+
+# 🛠️ FUNCIÓN: Color de texto por celda según intensidad del fondo ("" en celdas vacías)
+def colores_texto(tabla, textos, norm):
+    valores = tabla.to_numpy()
+    con_valor = ~np.isnan(valores.astype(float))
+    intensidad = np.asarray(norm(np.where(con_valor, valores, np.nan)), dtype=float)
+
+    colores = np.where(intensidad > UMBRAL_TEXTO_BLANCO, "white", "black").astype(object)
+    colores[textos.to_numpy() == "NEW"] = "lime"
+    colores[~con_valor] = ""
+    return colores
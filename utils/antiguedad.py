@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+# Motor de antigüedad de cartera (CxC). El modelo (montos y vencimientos parseados, índice por deudor) se
+# construye una vez por libro; la antigüedad se calcula por fecha de corte explícita, así que es reproducible
+# y memorizable por fecha. Los tramos de todos los esquemas salen de una sola búsqueda binaria.
+
+# Esquemas de antigüedad: límites superiores en días (intervalos cerrados a la derecha, como pd.cut)
+ESQUEMAS = {
+    "riesgo": {
+        "limites": [0, 30, 60, 90, 180],
+        "etiquetas": ['Por vencer', '1-30 días', '31-60 días', '61-90 días', '91-180 días', '>180 días'],
+        # Verde, verde claro, amarillo, naranja, rojo, rojo oscuro
+        "colores": ['#4CAF50', '#8BC34A', '#FFEB3B', '#FF9800', '#F44336', '#B71C1C'],
+    },
+    "agentes": {
+        "limites": [0, 30, 60, 90],
+        "etiquetas": ['Por vencer', '1-30 días', '31-60 días', '61-90 días', '>90 días'],
+        # Verde, verde claro, amarillo, naranja, rojo
+        "colores": ['#4CAF50', '#8BC34A', '#FFEB3B', '#FF9800', '#F44336'],
+    },
+}
+
+SIN_CLASIFICAR = -1
+
+# Caracteres que se descartan de un importe con formato ("$1,234.56" → 1234.56); el separador de filas
+# permite limpiar toda la columna con un solo str.translate
+_SEPARADORES = str.maketrans("", "", "$, \u00a0\t")
+_SEPARADOR_FILAS = "\x00"
+
+
+# 🛠️ FUNCIÓN: Importes con formato local → float (numéricos pasan directo; vacíos / inválidos → 0)
+def parsear_montos(valores):
+    serie = pd.Series(valores).reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return np.nan_to_num(serie.to_numpy(dtype=np.float64, na_value=np.nan), nan=0.0)
+
+    montos = np.zeros(len(serie), dtype=np.float64)
+    presentes = serie.notna().to_numpy()
+    textos = serie[presentes].astype(str).tolist()
+    limpios = _SEPARADOR_FILAS.join(textos).translate(_SEPARADORES).split(_SEPARADOR_FILAS)
+    if len(limpios) != len(textos):
+        limpios = [t.translate(_SEPARADORES) for t in textos]
+
+    try:
+        # Conversión en C de toda la columna (caso normal: sólo dígitos, punto y signo)
+        montos[presentes] = np.array(limpios, dtype=str).astype(np.float64)
+    except ValueError:
+        # Texto con letras u otros símbolos ("USD 1,234.50"): se queda sólo con dígitos, punto y signo
+        limpios = pd.Series(limpios, dtype=object)
+        numeros = pd.to_numeric(limpios, errors="coerce")
+        restantes = numeros.isna()
+        numeros[restantes] = pd.to_numeric(
+            limpios[restantes].str.replace(r"[^\d.\-]", "", regex=True), errors="coerce"
+        )
+        montos[presentes] = np.nan_to_num(numeros.to_numpy(dtype=np.float64, na_value=np.nan), nan=0.0)
+    return montos
+
+
+# 🛠️ FUNCIÓN: Código de tramo por esquema con una sola búsqueda binaria sobre la unión de límites
+def clasificar(dias, esquemas=ESQUEMAS):
+    dias = np.asarray(dias, dtype=np.float64)
+    union = np.unique(np.concatenate([np.asarray(e["limites"], dtype=np.float64) for e in esquemas.values()]))
+    tramo = np.searchsorted(union, dias, side="left")
+    sin_dias = np.isnan(dias)
+
+    codigos = {}
+    for nombre, esquema in esquemas.items():
+        # Cada tramo de la unión cae completo en un tramo del esquema (se ubica por su límite superior)
+        superiores = np.append(union, np.inf)
+        mapa = np.searchsorted(np.asarray(esquema["limites"], dtype=np.float64), superiores, side="left")
+        codigos[nombre] = np.where(sin_dias, SIN_CLASIFICAR, mapa[tramo]).astype(np.int64)
+    return codigos
+
+
+def _tabla_tramos(codigos, saldos, esquema):
+    n = len(esquema["etiquetas"])
+    validos = codigos >= 0
+    return np.bincount(codigos[validos], weights=saldos[validos], minlength=n)
+
+
+# 🛠️ FUNCIÓN: Modelo de cartera independiente de la fecha de corte (se construye una vez por libro)
+#   Saldos y vencimientos parseados, códigos de deudor / agente, totales por deudor y posiciones por deudor
+def construir_modelo(deudas, columna_saldo="saldo_adeudado", columna_deudor="deudor",
+                     columna_agente="vendedor", columna_vencimiento="fecha_vencimiento"):
+    deudas = deudas.reset_index(drop=True).copy(deep=False)
+    saldos = parsear_montos(deudas[columna_saldo])
+    deudas[columna_saldo] = saldos
+
+    modelo = {"deudas": deudas, "saldo": saldos, "total": float(saldos.sum())}
+
+    if columna_vencimiento in deudas.columns:
+        fechas = deudas[columna_vencimiento]
+        if not pd.api.types.is_datetime64_any_dtype(fechas):
+            fechas = pd.to_datetime(fechas, errors="coerce", dayfirst=True)
+        deudas[columna_vencimiento] = fechas
+        modelo["vencimientos"] = fechas.to_numpy(dtype="datetime64[ns]")
+
+    cod_deudor, etiquetas_deudor = pd.factorize(deudas[columna_deudor], sort=True)
+    modelo["cod_deudor"] = cod_deudor
+
+    # Totales por deudor (orden alfabético, como groupby)
+    con_deudor = cod_deudor >= 0
+    modelo["por_deudor"] = pd.Series(
+        np.bincount(cod_deudor[con_deudor], weights=saldos[con_deudor], minlength=len(etiquetas_deudor)),
+        index=pd.Index(etiquetas_deudor, name=columna_deudor), name=columna_saldo
+    )
+
+    # Índice deudor → posiciones (ordenadas por vencimiento descendente) para el detalle
+    orden = np.arange(len(deudas), dtype=np.int64)
+    if columna_vencimiento in deudas.columns:
+        orden = (
+            deudas[columna_vencimiento].sort_values(ascending=False, kind="stable", na_position="last")
+            .index.to_numpy(dtype=np.int64)
+        )
+    orden = orden[cod_deudor[orden] >= 0]
+    orden = orden[np.argsort(cod_deudor[orden], kind="stable")]
+    cortes = np.flatnonzero(np.diff(cod_deudor[orden])) + 1
+    grupos = np.split(orden, cortes) if len(orden) else []
+    modelo["posiciones_deudor"] = {etiquetas_deudor[cod_deudor[pos[0]]]: pos for pos in grupos}
+    # Lista para el selector en orden de aparición (como unique)
+    modelo["deudores"] = deudas[columna_deudor].unique().tolist()
+
+    if columna_agente in deudas.columns:
+        modelo["cod_agente"], modelo["agentes"] = pd.factorize(deudas[columna_agente], sort=True)
+        modelo["columna_agente"] = columna_agente
+    return modelo
+
+
+# 🛠️ FUNCIÓN: Posiciones de un deudor en el modelo (vencimiento más reciente primero)
+def posiciones_deudor(modelo, deudor):
+    return modelo["posiciones_deudor"].get(deudor, np.empty(0, dtype=np.int64))
+
+
+# 🛠️ FUNCIÓN: Días vencidos a la fecha de corte (NaN sin fecha); enteros si todas las filas tienen fecha
+def _dias_a_corte(vencimientos, fecha_corte):
+    dias = (pd.Timestamp(fecha_corte).to_datetime64() - vencimientos) // np.timedelta64(1, "D")
+    sin_fecha = np.isnat(vencimientos)
+    return np.where(sin_fecha, np.nan, dias) if sin_fecha.any() else dias
+
+
+# 🛠️ FUNCIÓN: Antigüedad de la cartera a una fecha de corte: días, riesgo, agente × tramo y deuda vencida
+def analizar(modelo, fecha_corte, columna_saldo="saldo_adeudado"):
+    if "vencimientos" not in modelo:
+        return {}
+
+    saldos = modelo["saldo"]
+    dias = _dias_a_corte(modelo["vencimientos"], fecha_corte)
+    codigos = clasificar(dias)
+    con_agente = "cod_agente" in modelo
+    cod_agente = modelo["cod_agente"] if con_agente else np.zeros(len(saldos), dtype=np.int64)
+
+    # Una sola reducción sobre las filas: (agente, tramo fino) → saldo
+    # (el tramo del esquema de agentes se deriva del fino: sus límites están contenidos en los de riesgo)
+    cubo = (
+        pd.DataFrame({"agente": cod_agente, "tramo": codigos["riesgo"], "saldo": saldos})
+        .groupby(["agente", "tramo"], sort=False)["saldo"].sum()
+        .reset_index()
+    )
+    agente_cubo = cubo["agente"].to_numpy()
+    tramo_cubo = cubo["tramo"].to_numpy()
+    saldo_cubo = cubo["saldo"].to_numpy()
+    mapa_agentes = clasificar(np.asarray(ESQUEMAS["riesgo"]["limites"] + [np.inf], dtype=np.float64))["agentes"]
+    tramo_agente_cubo = np.where(tramo_cubo >= 0, mapa_agentes[np.maximum(tramo_cubo, 0)], SIN_CLASIFICAR)
+
+    esquema = ESQUEMAS["riesgo"]
+    riesgo = pd.DataFrame({
+        "nivel_riesgo": pd.Categorical(esquema["etiquetas"], categories=esquema["etiquetas"], ordered=True),
+        columna_saldo: _tabla_tramos(tramo_cubo, saldo_cubo, esquema),
+    })
+    riesgo["porcentaje"] = (riesgo[columna_saldo] / modelo["total"]) * 100
+    resultado = {
+        "dias_vencido": dias,
+        "riesgo": riesgo,
+        "vencida_dias": float(saldo_cubo[tramo_cubo > 0].sum()),
+    }
+
+    if con_agente:
+        etiquetas = ESQUEMAS["agentes"]["etiquetas"]
+        validos = (agente_cubo >= 0) & (tramo_agente_cubo >= 0)
+        celda = agente_cubo[validos] * len(etiquetas) + tramo_agente_cubo[validos]
+        matriz = np.bincount(
+            celda, weights=saldo_cubo[validos], minlength=len(modelo["agentes"]) * len(etiquetas)
+        ).reshape(-1, len(etiquetas))
+        resultado["agente_tramo"] = pd.DataFrame(
+            matriz,
+            index=pd.Index(modelo["agentes"], name=modelo["columna_agente"]),
+            columns=pd.CategoricalIndex(etiquetas, categories=etiquetas, ordered=True, name="categoria_agente"),
+        )
+
+    return resultado
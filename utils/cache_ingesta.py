@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils import tipos
+
+# Caché de datasets normalizados compartida por todas las sesiones del servidor.
+# La clave es la huella del contenido (+ hoja y variante): dos usuarios que suben el mismo archivo
+# reciben el mismo dataset en memoria (y los mismos artefactos pre-agregados que cuelgan de él).
+# Los datasets compartidos son de sólo lectura: cada página trabaja sobre copias superficiales.
+
+# Datasets recientes que cada sesión mantiene referenciados (el activo y los anteriores)
+MAX_ENTRADAS = 3
+
+# Tope de memoria para los datasets que ninguna sesión referencia (expulsión LRU por bytes)
+MAX_MB = 2048
+
+_CLAVE_CACHE = "_cache_ingesta"
+_CLAVE_STATS = "_cache_ingesta_stats"
+_CLAVE_SESION = "_cache_ingesta_sesion"
+
+# clave → {"datos", "mb", "sesiones": WeakSet de fichas de sesión}; orden = uso más reciente al final
+_entradas = OrderedDict()
+_candado = threading.RLock()
+
+
+# Ficha de sesión: vive en st.session_state, así que al cerrarse la sesión desaparece del WeakSet
+# y sus datasets dejan de contar como referenciados (no hace falta liberar a mano)
+class _Sesion:
+    __slots__ = ("__weakref__",)
+
+
+# 🛠️ FUNCIÓN: Huella del contenido subido (memorizada por file_id para no re-hashear en cada rerun)
+def huella_archivo(archivo):
+    file_id = getattr(archivo, "file_id", None)
+    previa = st.session_state.get("_huella_archivo")
+    if file_id is not None and previa and previa[0] == file_id:
+        return previa[1]
+
+    huella = hashlib.sha256(archivo.getvalue()).hexdigest()
+    st.session_state["_huella_archivo"] = (file_id, huella)
+    return huella
+
+
+def clave_cache(huella, hoja=None, variante=""):
+    return f"{huella}:{hoja or ''}:{variante}"
+
+
+def _sesion():
+    if _CLAVE_CACHE not in st.session_state:
+        st.session_state[_CLAVE_CACHE] = OrderedDict()
+        st.session_state[_CLAVE_STATS] = {"hits": 0, "misses": 0, "ultimo": None}
+        st.session_state[_CLAVE_SESION] = _Sesion()
+    return st.session_state[_CLAVE_CACHE], st.session_state[_CLAVE_SESION]
+
+
+def _memoria_mb(datos):
+    mb = datos.get("memoria", {}).get("memoria_despues_mb")
+    if mb is None:
+        mb = tipos.memoria_mb(datos["ventas"])
+    return mb + sum(tipos.memoria_mb(df) for df in (datos.get("cxc") or {}).values())
+
+
+# 🛠️ FUNCIÓN: Expulsar (LRU) datasets sin sesiones que los usen hasta quedar bajo MAX_MB
+def _expulsar():
+    total = sum(entrada["mb"] for entrada in _entradas.values())
+    for clave in list(_entradas):
+        if total <= MAX_MB:
+            break
+        entrada = _entradas[clave]
+        if not entrada["sesiones"]:
+            total -= entrada["mb"]
+            del _entradas[clave]
+
+
+# 🛠️ FUNCIÓN: La sesión pasa a referenciar el dataset (suelta el más antiguo si supera MAX_ENTRADAS)
+def _referenciar(clave, entrada):
+    locales, ficha = _sesion()
+    locales[clave] = entrada["datos"]
+    locales.move_to_end(clave)
+    entrada["sesiones"].add(ficha)
+    while len(locales) > MAX_ENTRADAS:
+        vieja, _ = locales.popitem(last=False)
+        if vieja in _entradas:
+            _entradas[vieja]["sesiones"].discard(ficha)
+    _expulsar()
+
+
+# 🛠️ FUNCIÓN: Buscar dataset normalizado en la caché compartida (None si no existe)
+def obtener(clave):
+    _sesion()
+    stats = st.session_state[_CLAVE_STATS]
+    with _candado:
+        entrada = _entradas.get(clave)
+        if entrada is None:
+            stats["misses"] += 1
+            stats["ultimo"] = "MISS"
+            return None
+
+        _entradas.move_to_end(clave)
+        _referenciar(clave, entrada)
+    stats["hits"] += 1
+    stats["ultimo"] = "HIT"
+    return entrada["datos"]
+
+
+# 🛠️ FUNCIÓN: Guardar dataset normalizado (si otra sesión ya guardó la misma clave, se usa ese)
+def guardar(clave, valor):
+    with _candado:
+        entrada = _entradas.get(clave)
+        if entrada is None:
+            entrada = _entradas[clave] = {"datos": valor, "mb": _memoria_mb(valor), "sesiones": weakref.WeakSet()}
+        _entradas.move_to_end(clave)
+        _referenciar(clave, entrada)
+        return entrada["datos"]
+
+
+def estadisticas(clave=None):
+    locales, _ = _sesion()
+    stats = st.session_state[_CLAVE_STATS]
+    with _candado:
+        entrada = _entradas.get(clave)
+        return {
+            "ultimo": stats["ultimo"],
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "entradas": len(locales),
+            "max_entradas": MAX_ENTRADAS,
+            "compartidas": len(_entradas),
+            "mb": sum(e["mb"] for e in _entradas.values()),
+            "max_mb": MAX_MB,
+            "sesiones": len(entrada["sesiones"]) if entrada else 0,
+        }
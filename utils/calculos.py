@@ -0,0 +1,299 @@
+import numpy as np
+import pandas as pd
+
+from utils import (
+    agregados, antiguedad, anotaciones, columnas, cubo_ventas, derivadas, indice_ventas, motor_sql, periodos,
+)
+
+# Capa de cálculo sin Streamlit: cada función recibe el dataset (o un artefacto ya construido) y parámetros,
+# y devuelve tablas y valores listos para dibujar. Las páginas de main/ sólo memorizan y muestran; lo mismo
+# puede correr en lotes, benchmarks o cachés fuera de la interfaz. Los datos faltantes se reportan con
+# ValueError (mensaje listo para mostrar).
+
+MESES = np.arange(1, 13)
+
+HOJAS_CXC = ["CXC VIGENTES", "CXC VENCIDAS"]
+
+# Periodos del heatmap con crecimiento interanual (el rango personalizado no lo tiene)
+PERIODOS_INTERANUALES = ("Mensual", "Trimestral", "Anual")
+
+
+# ---------------------------------------------------------------------------
+# KPIs generales
+# ---------------------------------------------------------------------------
+
+# 🛠️ FUNCIÓN: Columna USD para los KPIs (requiere además valor_mn_calc, derivado de 'fecha' en la ingesta)
+def columna_kpi(df):
+    columna_usd = derivadas.columna_usd(df)
+    if columna_usd is None:
+        raise ValueError("No se encontró la columna 'valor_usd', 'ventas_usd' ni 'ventas_usd_con_iva'.")
+    if "valor_mn_calc" not in df.columns:
+        raise ValueError("No se encontró la columna 'fecha' para aplicar el tipo de cambio.")
+    return columna_usd
+
+
+def totales_ventas(df, columna_usd):
+    return {"usd": df[columna_usd].sum(), "mn": df["valor_mn_calc"].sum(), "operaciones": len(df)}
+
+
+# 🛠️ FUNCIÓN: Posiciones y filas que cumplen los filtros (posiciones None = sin filtro)
+def filtrar_ventas(df, indice, filtros):
+    posiciones = indice_ventas.filtrar(indice, filtros)
+    return posiciones, (df if posiciones is None else df.iloc[posiciones])
+
+
+# 🛠️ FUNCIÓN: Líneas de producto presentes (en orden de aparición) para el filtro opcional
+def lineas_producto(df):
+    return list(df["linea_producto"].dropna().unique()) if "linea_producto" in df.columns else []
+
+
+# 🛠️ FUNCIÓN: KPIs del dataset y del filtro, detalle más reciente y (con 'agente') ranking y vistas por vendedor
+#   indice y cubo pueden venir ya construidos (memorizados por dataset); si no, se construyen aquí
+def kpis_ventas(df, filtros=None, motor=motor_sql.MOTOR_PANDAS, indice=None, cubo=None, filas_detalle=50):
+    columna_usd = columna_kpi(df)
+    filtros = dict(filtros or {})
+    if indice is None:
+        indice = indice_ventas.construir_indice(df)
+
+    posiciones, filtrado = filtrar_ventas(df, indice, filtros)
+    resultado = {
+        "columna_usd": columna_usd,
+        "totales": totales_ventas(df, columna_usd),
+        "totales_filtro": totales_ventas(filtrado, columna_usd),
+        "detalle": df.iloc[indice_ventas.recientes(indice, posiciones, filas_detalle)],
+    }
+    if "agente" in df.columns:
+        if cubo is None:
+            cubo = agregados.cubo_kpi(df, columna_usd, motor)
+        resultado.update(agregados.vistas_kpi(cubo, filtros))
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Comparativo año vs año
+# ---------------------------------------------------------------------------
+
+# 🛠️ FUNCIÓN: Columna de valor y columnas de periodo (año/mes del archivo o 'fecha') para el comparativo
+def columnas_comparativo(df):
+    # Compatibilidad: valor_usd = importe o ventas_usd
+    columna_valor = columnas.resolver(df.columns, "valor_usd")
+    if columna_valor is None:
+        raise ValueError("No se encontró la columna 'valor_usd', 'valor usd', 'ventas_usd' ni 'importe'.")
+
+    periodo = {nombre: columnas.resolver(df.columns, nombre) for nombre in ("año", "mes", "fecha")}
+    if not (periodo["año"] and periodo["mes"]) and not periodo["fecha"]:
+        raise ValueError("No se encontraron columnas 'año' y 'mes' ni 'fecha' para agrupar por periodo.")
+    return columna_valor, periodo
+
+
+def _matriz(df, periodo, columna_valor, motor):
+    if motor != motor_sql.MOTOR_PANDAS:
+        largo = motor_sql.ventas_anio_mes(df, columna_valor, motor)
+        return cubo_ventas.matriz_anio_mes(largo["año"], largo["mes"], largo[columna_valor])
+
+    if periodo["año"] and periodo["mes"]:
+        anios, meses = df[periodo["año"]], df[periodo["mes"]]
+    else:
+        fechas = pd.to_datetime(df[periodo["fecha"]], errors="coerce")
+        anios, meses = fechas.dt.year, fechas.dt.month
+    return cubo_ventas.matriz_anio_mes(anios, meses, df[columna_valor])
+
+
+# 🛠️ FUNCIÓN: Ventas año × mes: matriz (años × 12), meses con datos, tabla y formato largo para gráficos
+def ventas_anio_mes(df, motor=motor_sql.MOTOR_PANDAS):
+    columna_valor, periodo = columnas_comparativo(df)
+    anios, matriz, presentes = _matriz(df, periodo, columna_valor, motor)
+    return {
+        "columna_valor": columna_valor,
+        "anios": anios,
+        "matriz": matriz,
+        "presentes": presentes,
+        "tabla": pd.DataFrame(matriz, index=pd.Index(anios, name="año"), columns=pd.Index(MESES, name="mes")),
+        # Formato largo directo de la matriz, mes por mes
+        "largo": pd.DataFrame({
+            "año": np.tile(anios, 12),
+            "mes": np.repeat(MESES, len(anios)),
+            "valor_usd": matriz.T.ravel(),
+        }),
+    }
+
+
+# 🛠️ FUNCIÓN: Comparativo mes a mes entre dos años (sólo meses con ventas en alguno), diferencia y % de variación
+def comparativo_anios(ventas, anio_1, anio_2):
+    anios = list(ventas["anios"])
+    fila_1, fila_2 = anios.index(anio_1), anios.index(anio_2)
+    matriz, presentes = ventas["matriz"], ventas["presentes"]
+    con_datos = presentes[fila_1] | presentes[fila_2]
+    indice_meses = pd.Index(MESES[con_datos], name="mes")
+
+    comparativo = pd.DataFrame({
+        f"{anio_1}": pd.Series(matriz[fila_1, con_datos], index=indice_meses),
+        f"{anio_2}": pd.Series(matriz[fila_2, con_datos], index=indice_meses)
+    })
+
+    comparativo[f"{anio_1}"] = pd.to_numeric(comparativo[f"{anio_1}"], errors="coerce").fillna(0)
+    comparativo[f"{anio_2}"] = pd.to_numeric(comparativo[f"{anio_2}"], errors="coerce").fillna(0)
+
+    comparativo["Diferencia"] = comparativo[f"{anio_2}"] - comparativo[f"{anio_1}"]
+    comparativo["% Variación"] = (
+        (comparativo["Diferencia"] / comparativo[f"{anio_1}"].replace(0, pd.NA)) * 100
+    ).round(2)
+    return comparativo
+
+
+# ---------------------------------------------------------------------------
+# Heatmap de ventas
+# ---------------------------------------------------------------------------
+
+# 🛠️ FUNCIÓN: Columnas de línea e importe para el heatmap (alias del registro de columnas)
+def columnas_heatmap(df):
+    columna_linea = columnas.resolver(df.columns, "linea")
+    columna_importe = columnas.resolver(df.columns, "importe")
+    if columna_linea is None or columna_importe is None:
+        raise ValueError("❌ No se encontraron las columnas clave necesarias para 'línea' e 'importe'.")
+    return columna_linea, columna_importe
+
+
+# 🛠️ FUNCIÓN: Cubo mes × línea (base de los periodos Mensual / Trimestral / Anual)
+def cubo_mensual(df, motor=motor_sql.MOTOR_PANDAS):
+    return cubo_ventas.cubo_mensual(df, *columnas_heatmap(df), motor)
+
+
+# 🛠️ FUNCIÓN: Cubo día × línea (base del rango personalizado)
+def cubo_diario(df, motor=motor_sql.MOTOR_PANDAS):
+    return cubo_ventas.cubo_diario(df, *columnas_heatmap(df), motor)
+
+
+# 🛠️ FUNCIÓN: Cubo periodo × línea: enrollado desde el cubo mensual o recortado del diario entre dos fechas
+def cubo_periodo(periodo_tipo, cubo=None, cubo_dia=None, inicio=None, fin=None):
+    if periodo_tipo not in PERIODOS_INTERANUALES:
+        return cubo_ventas.rango(cubo_dia, inicio, fin)
+    return cubo_ventas.enrollar(cubo, periodo_tipo)
+
+
+# 🛠️ FUNCIÓN: Tabla del heatmap (periodo etiquetado × línea), opcionalmente sólo con algunas líneas
+def tabla_heatmap(cubo_per, periodo_tipo, lineas=None):
+    tabla = cubo_ventas.etiquetar(cubo_per, periodo_tipo)
+    return tabla if lineas is None else tabla.loc[:, lineas]
+
+
+# 🛠️ FUNCIÓN: Heatmap final: filtro por importe, top N líneas y anotaciones (con % de crecimiento interanual)
+#   Devuelve la tabla, los textos por celda, las líneas con ventas nuevas y el error del crecimiento (si lo hubo)
+def heatmap(tabla, cubo_per, periodo_tipo, importe=None, top_n=None, crecimiento=False):
+    if importe is not None:
+        tabla = anotaciones.filtrar_importe(tabla, *importe)
+    top_lineas = tabla.sum(axis=0).sort_values(ascending=False).head(top_n).index.tolist()
+    tabla = tabla[top_lineas]
+
+    resultado = {"tabla": tabla, "nuevas_lineas": [], "error_crecimiento": None}
+    if crecimiento and periodo_tipo in PERIODOS_INTERANUALES:
+        try:
+            grupos = periodos.grupo_interanual(cubo_per.index, periodo_tipo)
+            resultado["textos"], resultado["nuevas_lineas"] = anotaciones.anotaciones(
+                tabla, anotaciones.crecimiento(tabla, grupos)
+            )
+            return resultado
+        except Exception as e:
+            resultado["error_crecimiento"] = str(e)
+    resultado["textos"], _ = anotaciones.anotaciones(tabla)
+    return resultado
+
+
+# ---------------------------------------------------------------------------
+# Cartera CxC
+# ---------------------------------------------------------------------------
+
+# 🛠️ FUNCIÓN: Vigentes + vencidas normalizadas en una sola tabla de deudas
+def unificar_hojas(hojas_cxc):
+    # Leer y normalizar datos (copia superficial: las hojas precargadas se comparten entre reruns)
+    df_vigentes = hojas_cxc['CXC VIGENTES'].copy(deep=False)
+    df_vencidas = hojas_cxc['CXC VENCIDAS'].copy(deep=False)
+
+    df_vigentes = columnas.normalizar_columnas(df_vigentes, deduplicar=True)
+    df_vencidas = columnas.normalizar_columnas(df_vencidas, deduplicar=True)
+
+    # Renombrar columnas clave con los alias del registro - PRIORIZAR COLUMNA F (CLIENTE) sobre 'razon_social'
+    canonicas = ['deudor', 'linea_negocio', 'saldo_adeudado', 'fecha_vencimiento']
+    df_vigentes = columnas.renombrar_canonicas(df_vigentes, canonicas)
+    df_vencidas = columnas.renombrar_canonicas(df_vencidas, canonicas)
+
+    # Si 'cliente' quedó como deudor, 'razon_social' sobra
+    df_vigentes = df_vigentes.drop(columns=['razon_social'], errors='ignore')
+    df_vencidas = df_vencidas.drop(columns=['razon_social'], errors='ignore')
+
+    # Agregar origen
+    df_vigentes['origen'] = 'VIGENTE'
+    df_vencidas['origen'] = 'VENCIDA'
+
+    # Unificar columnas
+    common_cols = list(set(df_vigentes.columns) & set(df_vencidas.columns))
+    df_deudas = pd.concat([
+        df_vigentes[common_cols],
+        df_vencidas[common_cols]
+    ], ignore_index=True)
+
+    # Limpieza
+    df_deudas = df_deudas.dropna(axis=1, how='all')
+
+    # Manejar duplicados
+    duplicados = df_deudas.columns[df_deudas.columns.duplicated()]
+    if not duplicados.empty:
+        df_deudas = df_deudas.loc[:, ~df_deudas.columns.duplicated(keep='first')]
+
+    return df_deudas
+
+
+# 🛠️ FUNCIÓN: Modelo de cartera desde las hojas CxC (saldos y vencimientos parseados, índice por deudor)
+def modelo_cartera(hojas_cxc):
+    if any(h not in hojas_cxc for h in HOJAS_CXC):
+        raise ValueError("❌ No se encontraron las hojas requeridas: 'CXC VIGENTES' y 'CXC VENCIDAS'.")
+
+    df_deudas = unificar_hojas(hojas_cxc)
+    if 'saldo_adeudado' not in df_deudas.columns:
+        raise ValueError(
+            f"❌ No existe columna de saldo en los datos. Columnas disponibles: {df_deudas.columns.tolist()}"
+        )
+    if 'deudor' not in df_deudas.columns:
+        raise ValueError(
+            "❌ No se encontró columna para identificar deudores. "
+            "Se esperaba 'cliente' o 'razon_social' en los encabezados"
+        )
+    return antiguedad.construir_modelo(df_deudas)
+
+
+# 🛠️ FUNCIÓN: Reporte de cartera a una fecha de corte: totales, principales deudores y antigüedad
+#   vencida es None si las hojas no traen 'estatus'; agente_tramo es None sin vendedor o sin vencimientos
+def reporte_cartera(modelo, fecha_corte, top=5):
+    df_deudas = modelo["deudas"]
+    analisis = antiguedad.analizar(modelo, fecha_corte)
+
+    vencida = None
+    try:
+        vencida = df_deudas.loc[df_deudas["estatus"].str.contains("VENCID", na=False), "saldo_adeudado"].sum()
+    except (KeyError, AttributeError):
+        # Sin 'estatus' (o sin texto en ella) no hay clasificación vigente / vencida
+        pass
+
+    agente_tramo = None
+    if "vendedor" in df_deudas.columns and "agente_tramo" in analisis:
+        # Ordenado por el total de deuda
+        agente_tramo = analisis["agente_tramo"].copy()
+        agente_tramo["Total"] = agente_tramo.sum(axis=1)
+        agente_tramo = agente_tramo.sort_values("Total", ascending=False)
+
+    return {
+        "total": modelo["total"],
+        "vencida": vencida,
+        "top_deudores": modelo["por_deudor"].nlargest(top),
+        "analisis": analisis,
+        "agente_tramo": agente_tramo,
+    }
+
+
+# 🛠️ FUNCIÓN: Documentos de un deudor (vencimiento más reciente primero) con días vencidos a la fecha de corte
+def detalle_deudor(modelo, analisis, deudor):
+    posiciones = antiguedad.posiciones_deudor(modelo, deudor)
+    detalle = modelo["deudas"].iloc[posiciones]
+    if "dias_vencido" in analisis:
+        detalle = detalle.assign(dias_vencido=analisis["dias_vencido"][posiciones])
+    return detalle
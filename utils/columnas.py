@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+
+from unidecode import unidecode
+
+# Registro único de nombres de columna: normalización de encabezados y alias → nombre canónico.
+# Los alias se normalizan una sola vez al importar; lo que depende de los encabezados de un archivo
+# se memoriza por firma (tupla de encabezados), así que repetir una carga cuesta O(columnas).
+
+# Alias por nombre canónico, en orden de prioridad (el primero presente gana)
+ALIAS = {
+    "año": ["año", "ano", "anio", "aÃ±o", "aã±o"],
+    "usd": ["valor_usd", "ventas_usd", "ventas_usd_con_iva"],
+    "valor_usd": ["valor_usd", "valor usd", "ventas_usd", "importe"],
+    "importe": ["valor_mn", "importe", "valor_usd", "valor mn"],
+    "linea": ["linea_producto", "linea_prodcucto", "linea_de_negocio", "linea producto", "linea_de_producto"],
+    "agente": ["agente", "vendedor", "ejecutivo"],
+    "fecha": ["fecha"],
+    "mes": ["mes"],
+    "deudor": ["cliente", "razon_social"],
+    "saldo_adeudado": ["saldo_adeudado", "saldo", "saldo_usd"],
+    "fecha_vencimiento": ["fecha_vencimiento", "vencimiento"],
+    "linea_negocio": ["linea_negocio", "linea_de_negocio"],
+}
+
+# Firmas de encabezados memorizadas (las más antiguas se descartan)
+MAX_FIRMAS = 64
+
+_normalizados = OrderedDict()
+_mapas = OrderedDict()
+_candado = threading.Lock()
+
+
+def normalizar_nombre(nombre):
+    return unidecode(str(nombre).lower().strip().replace(" ", "_"))
+
+
+# Tabla precompilada: alias normalizado → nombres canónicos que lo aceptan, con su prioridad
+ALIAS_NORMALIZADOS = {
+    canonico: list(dict.fromkeys(normalizar_nombre(alias) for alias in alias_lista))
+    for canonico, alias_lista in ALIAS.items()
+}
+
+
+# Las cargas en segundo plano normalizan desde hilos trabajadores: las memos se tocan bajo candado
+def _memo(cache, clave, constructor):
+    with _candado:
+        if clave in cache:
+            cache.move_to_end(clave)
+            return cache[clave]
+    valor = constructor()
+    with _candado:
+        cache[clave] = valor
+        while len(cache) > MAX_FIRMAS:
+            cache.popitem(last=False)
+    return valor
+
+
+def _normalizar(firma, deduplicar):
+    nuevos = [normalizar_nombre(col) for col in firma]
+    if not deduplicar:
+        return nuevos
+
+    # Encabezados repetidos tras normalizar: 'saldo', 'saldo_2', 'saldo_3', ...
+    contador = {}
+    for i, nombre in enumerate(nuevos):
+        contador[nombre] = contador.get(nombre, 0) + 1
+        if contador[nombre] > 1:
+            nuevos[i] = f"{nombre}_{contador[nombre]}"
+    return nuevos
+
+
+# 🛠️ FUNCIÓN: Encabezados normalizados (minúsculas, sin acentos, '_' por espacios), memorizados por firma
+def normalizar_encabezados(columnas, deduplicar=False):
+    firma = tuple(columnas)
+    return list(_memo(_normalizados, (firma, deduplicar), lambda: _normalizar(firma, deduplicar)))
+
+
+# 🛠️ FUNCIÓN: Normalizar los encabezados de un DataFrame (en sitio)
+def normalizar_columnas(df, deduplicar=False):
+    df.columns = normalizar_encabezados(df.columns, deduplicar)
+    return df
+
+
+# 🛠️ FUNCIÓN: Encabezado normalizado → nombre real de la columna (la primera si varias coinciden)
+def mapa_columnas(columnas):
+    firma = tuple(columnas)
+
+    def construir():
+        mapa = {}
+        for col, normalizado in zip(firma, normalizar_encabezados(firma)):
+            mapa.setdefault(normalizado, col)
+        return mapa
+
+    return _memo(_mapas, firma, construir)
+
+
+# 🛠️ FUNCIÓN: Columna real para un nombre canónico (None si no hay ningún alias presente)
+def resolver(columnas, canonico):
+    mapa = mapa_columnas(columnas)
+    return next((mapa[alias] for alias in ALIAS_NORMALIZADOS[canonico] if alias in mapa), None)
+
+
+# 🛠️ FUNCIÓN: Renombrar al nombre canónico la primera columna alias presente (si el canónico no existe ya)
+def renombrar_canonicas(df, canonicos):
+    renombres = {}
+    for canonico in canonicos:
+        if canonico in df.columns:
+            continue
+        col = resolver(df.columns, canonico)
+        if col is not None and col not in renombres:
+            renombres[col] = canonico
+    return df.rename(columns=renombres) if renombres else df
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from utils import motor_sql, periodos
+
+
+# 🛠️ FUNCIÓN: Cubo mensual (AAAAMM × línea) con la suma del importe; se construye una vez por dataset
+def cubo_mensual(df, columna_linea, columna_importe, motor=motor_sql.MOTOR_PANDAS):
+    if motor != motor_sql.MOTOR_PANDAS:
+        return motor_sql.cubo_mensual(df, columna_linea, columna_importe, motor)
+    codigos = periodos.codigos_periodo(df["fecha"], "Mensual")
+    validas = codigos != periodos.SIN_PERIODO
+    return _sumar(codigos[validas], df.loc[validas, columna_linea], df.loc[validas, columna_importe])
+
+
+# 🛠️ FUNCIÓN: Cubo diario (día × línea) para rangos personalizados de fechas
+def cubo_diario(df, columna_linea, columna_importe, motor=motor_sql.MOTOR_PANDAS):
+    if motor != motor_sql.MOTOR_PANDAS:
+        return motor_sql.cubo_diario(df, columna_linea, columna_importe, motor)
+    fechas = df["fecha"]
+    validas = fechas.notna().to_numpy()
+    dias = fechas[validas].dt.normalize().to_numpy()
+    return _sumar(dias, df.loc[validas, columna_linea], df.loc[validas, columna_importe])
+
+
+def _sumar(claves, lineas, importes):
+    return (
+        importes.groupby([claves, lineas], observed=True, sort=True)
+        .sum()
+        .unstack(fill_value=0)
+    )
+
+
+# 🛠️ FUNCIÓN: Enrollar el cubo mensual a trimestral / anual (sin tocar filas crudas)
+def enrollar(cubo, periodo_tipo):
+    if periodo_tipo == "Trimestral":
+        anio, mes = np.divmod(cubo.index.to_numpy(), 100)
+        return cubo.groupby(anio * 10 + (mes - 1) // 3 + 1).sum()
+    if periodo_tipo == "Anual":
+        return cubo.groupby(cubo.index.to_numpy() // 100).sum()
+    return cubo
+
+
+# 🛠️ FUNCIÓN: Recortar el cubo diario a [inicio, fin] y agrupar por mes (Rango Personalizado)
+def rango(cubo_dia, inicio, fin):
+    recorte = cubo_dia.loc[pd.Timestamp(inicio):pd.Timestamp(fin)]
+    codigos = periodos.codigos_periodo(pd.Series(recorte.index), "Rango Personalizado")
+    return recorte.groupby(codigos).sum()
+
+
+# 🛠️ FUNCIÓN: Cubo del periodo con índice de etiquetas ("23.01 - Jan-2023") listo para el heatmap
+def etiquetar(cubo_periodo, periodo_tipo):
+    tabla = periodos.etiquetas_periodo(cubo_periodo.index, periodo_tipo)
+    etiquetado = cubo_periodo.copy()
+    etiquetado.index = pd.Index(tabla["periodo_etiqueta"].to_numpy(), name="periodo_etiqueta")
+    return etiquetado
+
+
+# 🛠️ FUNCIÓN: Matriz densa año × 12 meses (np.bincount) + máscara de meses con datos
+#   Acepta filas crudas o ya agregadas (año, mes, valor); los años conservan su dtype original
+def matriz_anio_mes(anios, meses, valores):
+    anios = pd.Series(anios).reset_index(drop=True)
+    meses = pd.to_numeric(pd.Series(meses).reset_index(drop=True), errors="coerce")
+    valores = pd.to_numeric(pd.Series(valores).reset_index(drop=True), errors="coerce").fillna(0)
+
+    validas = (anios.notna() & meses.between(1, 12)).to_numpy()
+    unicos, fila = np.unique(anios[validas].to_numpy(), return_inverse=True)
+    celda = fila * 12 + meses[validas].to_numpy(dtype=np.int64) - 1
+
+    tamano = len(unicos) * 12
+    matriz = np.bincount(celda, weights=valores[validas].to_numpy(dtype=np.float64), minlength=tamano)
+    presentes = np.bincount(celda, minlength=tamano) > 0
+    return unicos, matriz.reshape(-1, 12), presentes.reshape(-1, 12)
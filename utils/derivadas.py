@@ -0,0 +1,62 @@
+import threading
+
+import pandas as pd
+
+from utils import columnas, tipo_cambio
+
+# Columnas derivadas que se calculan una sola vez al ingerir (y no en cada rerun de los módulos)
+
+# Clave en la entrada de caché con la versión de la tabla de tipos de cambio usada para derivar
+CLAVE_VERSION = "derivadas_version"
+# Columnas del dataset antes de derivar (lo que se persiste, p. ej. en el almacén local)
+CLAVE_ORIGINALES = "columnas_originales"
+
+# Las entradas de caché se comparten entre sesiones: una sola sesión deriva a la vez
+_candado = threading.Lock()
+
+
+def columna_usd(df):
+    return columnas.resolver(df.columns, "usd")
+
+
+def columna_agente(df):
+    return columnas.resolver(df.columns, "agente")
+
+
+# 🛠️ FUNCIÓN: Agregar anio, tipo_cambio, valor_mn_calc y agente estandarizado (en sitio, sin copiar el frame)
+def agregar_derivadas(df, tabla):
+    col_usd = columna_usd(df)
+    if "fecha" in df.columns and col_usd:
+        conversion = tipo_cambio.conversion_mn(df, col_usd, tabla)
+        df["anio"] = conversion["anio"]
+        df["tipo_cambio"] = conversion["tipo_cambio"]
+        df["valor_mn_calc"] = conversion["valor_mn_calc"]
+
+    col_agente = columna_agente(df)
+    if col_agente:
+        # Si ya es 'category' desde la ingesta se conserva para agrupar rápido
+        serie = df[col_agente]
+        if not isinstance(serie.dtype, pd.CategoricalDtype):
+            serie = serie.astype(str)
+        df["agente"] = serie
+    return df
+
+
+# 🛠️ FUNCIÓN: Asegurar que la entrada de caché tenga las derivadas al día con la tabla de tipos de cambio
+def asegurar_derivadas(datos):
+    tabla, version = tipo_cambio.tabla_tipos_cambio()
+    with _candado:
+        datos.setdefault(CLAVE_ORIGINALES, list(datos["ventas"].columns))
+        if datos.get(CLAVE_VERSION) != version:
+            # Sobre una copia superficial que luego reemplaza a la anterior: otras sesiones que ya
+            # leen el frame compartido nunca lo ven a medio derivar
+            datos["ventas"] = agregar_derivadas(datos["ventas"].copy(deep=False), tabla)
+            datos[CLAVE_VERSION] = version
+            # Los artefactos memorizados pueden depender de valor_mn_calc: se reconstruyen
+            datos["artefactos"] = {}
+    return datos
+
+
+# 🛠️ FUNCIÓN: Vista del dataset sin las columnas derivadas (columnas tal como salieron de la ingesta)
+def sin_derivadas(datos):
+    return datos["ventas"][datos.get(CLAVE_ORIGINALES, list(datos["ventas"].columns))]
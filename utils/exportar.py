@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    _HAY_PARQUET = True
+except ImportError:
+    _HAY_PARQUET = False
+
+# Formato → (extensión, MIME)
+FORMATOS = {
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": (".csv", "text/csv"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def formatos_disponibles():
+    return [f for f in FORMATOS if f != "Parquet" or _HAY_PARQUET]
+
+
+# 🛠️ FUNCIÓN: Serializar una tabla al formato pedido (sólo se llama cuando se solicita la descarga)
+def exportar(tabla, formato, hoja="Datos"):
+    buffer = io.BytesIO()
+    if formato == "Excel":
+        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
+            tabla.to_excel(writer, sheet_name=hoja)
+    elif formato == "CSV":
+        tabla.to_csv(buffer, encoding="utf-8")
+    elif formato == "Parquet":
+        # Parquet exige nombres de columna de texto
+        salida = tabla.copy()
+        salida.columns = salida.columns.astype(str)
+        salida.to_parquet(buffer)
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    return buffer.getvalue()
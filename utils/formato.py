@@ -0,0 +1,11 @@
+import numpy as np
+
+
+# 🛠️ FUNCIÓN: "$1,234.56" para un arreglo completo; celdas vacías (NaN) → ""
+def formato_moneda(valores, decimales=2):
+    valores = np.asarray(valores, dtype=float)
+    resultado = np.full(valores.shape, "", dtype=object)
+    con_valor = ~np.isnan(valores)
+    plantilla = f"${{:,.{decimales}f}}".format
+    resultado[con_valor] = [plantilla(v) for v in valores[con_valor].tolist()]
+    return resultado
@@ -0,0 +1,48 @@
+import numpy as np
+
+# Índice por dataset para filtros de KPIs: posiciones por agente / línea y orden por fecha precalculado.
+# Con él, filtrar y sacar "los N más recientes" cuesta O(resultado) en vez de recorrer todo el frame.
+
+
+def _posiciones_por_valor(serie):
+    grupos = serie.reset_index(drop=True).groupby(serie.to_numpy(), observed=True, sort=False).indices
+    return {valor: np.asarray(pos, dtype=np.int64) for valor, pos in grupos.items()}
+
+
+# 🛠️ FUNCIÓN: Construir el índice una vez por dataset (posiciones enteras, no etiquetas)
+def construir_indice(df, columnas=("agente", "linea_producto")):
+    # Más reciente primero; NaT al final; empates en el orden original de las filas
+    orden = (
+        df["fecha"].reset_index(drop=True)
+        .sort_values(ascending=False, kind="stable", na_position="last")
+        .index.to_numpy(dtype=np.int64)
+    )
+    rango = np.empty(len(orden), dtype=np.int64)
+    rango[orden] = np.arange(len(orden))
+
+    return {
+        "orden_fecha": orden,
+        "rango_fecha": rango,
+        "grupos": {col: _posiciones_por_valor(df[col]) for col in columnas if col in df.columns},
+    }
+
+
+# 🛠️ FUNCIÓN: Posiciones (ascendentes) que cumplen los filtros; None = sin filtro
+def filtrar(indice, filtros):
+    posiciones = None
+    for columna, valor in filtros.items():
+        pos = indice["grupos"][columna].get(valor, np.empty(0, dtype=np.int64))
+        posiciones = pos if posiciones is None else np.intersect1d(posiciones, pos, assume_unique=True)
+    return posiciones
+
+
+# 🛠️ FUNCIÓN: Las n filas más recientes de un subconjunto (argpartition sobre el rango de fecha)
+def recientes(indice, posiciones=None, n=50):
+    if posiciones is None:
+        return indice["orden_fecha"][:n]
+
+    rango = indice["rango_fecha"][posiciones]
+    if len(posiciones) > n:
+        k = np.argpartition(rango, n - 1)[:n]
+        posiciones, rango = posiciones[k], rango[k]
+    return posiciones[np.argsort(rango, kind="stable")]
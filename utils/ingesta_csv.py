@@ -0,0 +1,125 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from utils import columnas, derivadas, ingesta_fondo, periodos, tipos
+
+# Lectura de CSV por bloques: cada bloque se normaliza y tipa antes de leer el siguiente,
+# así nunca se materializa el archivo completo como texto (dtype object)
+FILAS_POR_BLOQUE = 200_000
+
+
+# 🛠️ FUNCIÓN: Bloques del CSV; siempre entrega al menos uno (un CSV sólo con encabezados da un bloque vacío,
+#   así el esquema, las claves de agregación y el resultado salen igual que con filas)
+def _bloques(archivo, filas_por_bloque):
+    datos = archivo.getvalue() if hasattr(archivo, "getvalue") else archivo
+
+    def fuente():
+        if isinstance(datos, bytes):
+            return io.BytesIO(datos)
+        if hasattr(datos, "seek"):
+            datos.seek(0)
+        return datos
+
+    vacio = True
+    for bloque in pd.read_csv(fuente(), chunksize=filas_por_bloque):
+        vacio = False
+        yield bloque
+    if vacio:
+        yield pd.read_csv(fuente(), nrows=0)
+
+
+def _reporte(antes, df):
+    despues = tipos.memoria_mb(df)
+    return {
+        "memoria_antes_mb": round(antes, 2),
+        "memoria_despues_mb": round(despues, 2),
+        "reduccion": round(antes / despues, 2) if despues else None,
+        "tipos": df.dtypes.astype(str).to_dict(),
+    }
+
+
+# 🛠️ FUNCIÓN: Leer un CSV por bloques; 'preparar' normaliza encabezados/año de cada bloque
+def leer_csv(archivo, preparar, filas_por_bloque=FILAS_POR_BLOQUE, float32=False, progreso=None):
+    bloques = []
+    categorias = None
+    antes = 0.0
+    ingesta_fondo.avanzar(progreso, etapa="Leyendo CSV por bloques")
+    for bloque in _bloques(archivo, filas_por_bloque):
+        ingesta_fondo.avanzar(progreso, filas=len(bloque))
+        bloque = preparar(bloque)
+        antes += tipos.memoria_mb(bloque)
+        bloque, reporte = tipos.aplicar_tipos(bloque, float32=float32, categorias=categorias)
+        if categorias is None:
+            # El esquema lo fija el primer bloque: todos los bloques deben coincidir para poder unirlos
+            categorias = {col for col, tipo in reporte["tipos"].items() if tipo == "category"}
+        bloques.append(bloque)
+
+    # La cardinalidad del primer bloque puede no representar al archivo: se revisa con el dataset completo
+    df = tipos.revisar_categorias(tipos.concatenar(bloques))
+    return df, _reporte(antes, df)
+
+
+# 🛠️ FUNCIÓN: Claves (agente, línea) e importes a sumar en la pre-agregación mensual
+def columnas_agregado(df):
+    if "fecha" not in df.columns:
+        raise ValueError("La pre-agregación requiere una columna 'fecha'.")
+    claves = [col for col in (derivadas.columna_agente(df), columnas.resolver(df.columns, "linea")) if col]
+    importes = [col for col in df.columns if col in tipos.COLUMNAS_IMPORTE]
+    return claves, importes
+
+
+# 🛠️ FUNCIÓN: Parcial mes × agente × línea de un bloque (sumas de importes + número de operaciones)
+def preagregar(bloque, claves, importes):
+    codigos = periodos.codigos_periodo(bloque["fecha"], "Mensual")
+    validas = codigos != periodos.SIN_PERIODO
+    grupos = (
+        bloque.loc[validas, claves + importes]
+        .assign(periodo_cod=codigos[validas])
+        .groupby(["periodo_cod"] + claves, observed=True, dropna=False)
+    )
+    parcial = grupos[importes].sum()
+    parcial["operaciones"] = grupos.size()
+    return parcial
+
+
+# 🛠️ FUNCIÓN: Combinar parciales en la tabla pre-agregada (una fila por mes, fecha = día 1)
+def combinar_preagregados(parciales, claves, importes, float32=False):
+    df = (
+        pd.concat(parciales)
+        .groupby(level=list(range(1 + len(claves))), observed=True, dropna=False)
+        .sum()
+        .reset_index()
+    )
+
+    anio, mes = np.divmod(df.pop("periodo_cod").to_numpy(), 100)
+    df.insert(0, "fecha", pd.to_datetime({"year": anio, "month": mes, "day": 1}))
+    for col in claves:
+        df[col] = df[col].astype("category")
+    for col in importes:
+        df[col] = df[col].astype("float32" if float32 else "float64")
+    return df
+
+
+# 🛠️ FUNCIÓN: Leer un CSV por bloques pre-agregando a mes × agente × línea (memoria acotada por el resultado)
+#   Cada fila resultante representa un mes (fecha = día 1) con la suma de importes y 'operaciones'
+def leer_csv_agregado(archivo, preparar, filas_por_bloque=FILAS_POR_BLOQUE, float32=False, progreso=None):
+    parciales = []
+    categorias = None
+    antes = 0.0
+    claves = importes = None
+    ingesta_fondo.avanzar(progreso, etapa="Pre-agregando CSV por bloques")
+    for bloque in _bloques(archivo, filas_por_bloque):
+        ingesta_fondo.avanzar(progreso, filas=len(bloque))
+        bloque = preparar(bloque)
+        antes += tipos.memoria_mb(bloque)
+        bloque, reporte = tipos.aplicar_tipos(bloque, float32=float32, categorias=categorias)
+        if categorias is None:
+            categorias = {col for col, tipo in reporte["tipos"].items() if tipo == "category"}
+            claves, importes = columnas_agregado(bloque)
+        # Los parciales son pequeños (mes × agente × línea): se combinan al final
+        parciales.append(preagregar(bloque, claves, importes))
+
+    df = combinar_preagregados(parciales, claves, importes, float32)
+    return df, _reporte(antes, df)
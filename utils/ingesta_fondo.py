@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import lector_excel
+
+# Ingesta en segundo plano: leer y normalizar un archivo corre en un hilo trabajador mientras la interfaz
+# sigue usando el dataset anterior. El progreso (etapa, hojas leídas, filas) vive en un dict que la interfaz
+# consulta; el dataset nuevo sólo se entrega completo, así que el cambio en la sesión es atómico.
+MAX_TRABAJOS = 2
+MAX_HILOS_HOJAS = 4
+
+# Trabajos terminados que nadie recogió (la sesión se cerró antes): su dataset queda fuera del tope
+# de la caché compartida, así que se conservan pocos
+MAX_TERMINADOS = 2
+
+_trabajos = OrderedDict()
+_candado = threading.Lock()
+_ejecutor = ThreadPoolExecutor(max_workers=MAX_TRABAJOS, thread_name_prefix="ingesta")
+_ejecutor_hojas = ThreadPoolExecutor(max_workers=MAX_HILOS_HOJAS, thread_name_prefix="ingesta_hojas")
+
+
+def nuevo_progreso(etapa="En cola"):
+    return {"etapa": etapa, "hojas_leidas": 0, "hojas_total": 0, "filas": 0, "inicio": time.time()}
+
+
+# 🛠️ FUNCIÓN: Actualizar el progreso de una ingesta (sin progreso no hace nada: sirve igual en modo síncrono)
+def avanzar(progreso, etapa=None, hojas=0, filas=0, hojas_total=None):
+    if progreso is None:
+        return
+    with _candado:
+        if etapa is not None:
+            progreso["etapa"] = etapa
+        if hojas_total is not None:
+            progreso["hojas_total"] = hojas_total
+        progreso["hojas_leidas"] += hojas
+        progreso["filas"] += filas
+
+
+def _podar():
+    terminados = [clave for clave, trabajo in _trabajos.items() if trabajo["futuro"].done()]
+    for clave in terminados[:max(0, len(terminados) - MAX_TERMINADOS)]:
+        del _trabajos[clave]
+
+
+# 🛠️ FUNCIÓN: Lanzar la ingesta de una clave (o reutilizar la que ya corre); funcion(..., progreso=...) → datos
+def iniciar(clave, funcion, *args, **kwargs):
+    with _candado:
+        trabajo = _trabajos.get(clave)
+        if trabajo is None:
+            progreso = nuevo_progreso()
+            futuro = _ejecutor.submit(funcion, *args, progreso=progreso, **kwargs)
+            trabajo = _trabajos[clave] = {"clave": clave, "progreso": progreso, "futuro": futuro}
+            _podar()
+        return trabajo
+
+
+def trabajo(clave):
+    with _candado:
+        return _trabajos.get(clave)
+
+
+# 🛠️ FUNCIÓN: Resultado de la ingesta si ya terminó (None mientras sigue en curso; relanza su error)
+#   Al terminar el trabajo se retira: el resultado pasa a la caché compartida y un error permite reintentar
+def recoger(clave):
+    with _candado:
+        actual = _trabajos.get(clave)
+        if actual is None or not actual["futuro"].done():
+            return None
+        del _trabajos[clave]
+    return actual["futuro"].result()
+
+
+# 🛠️ FUNCIÓN: Leer grupos de hojas en paralelo (p. ej. ventas y CxC), cada grupo en su propio hilo
+def leer_hojas_paralelo(fuente, grupos, motor=lector_excel.MOTOR_AUTO, progreso=None):
+    grupos = [list(grupo) for grupo in grupos if grupo]
+    avanzar(progreso, etapa="Leyendo hojas", hojas_total=sum(len(grupo) for grupo in grupos))
+
+    futuros = [_ejecutor_hojas.submit(lector_excel.leer_hojas, fuente, grupo, motor) for grupo in grupos]
+    resultado = {}
+    for futuro in as_completed(futuros):
+        leidas = futuro.result()
+        resultado.update(leidas)
+        avanzar(progreso, hojas=len(leidas), filas=sum(len(df) for df in leidas.values()))
+    return resultado
@@ -0,0 +1,183 @@
+import io
+import logging
+import time
+import zipfile
+from collections import deque
+from xml.etree import ElementTree
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+logger = logging.getLogger(__name__)
+
+# Orden de preferencia en modo "auto": el primero instalado y que no falle gana
+MOTORES = ["calamine", "openpyxl_streaming", "openpyxl"]
+MOTOR_AUTO = "auto"
+
+# Últimas lecturas (motor, hoja, segundos, ok) para el expander de debug
+registro_tiempos = deque(maxlen=20)
+
+
+def _datos(fuente):
+    if isinstance(fuente, (bytes, bytearray)):
+        return bytes(fuente)
+    if hasattr(fuente, "getvalue"):
+        return fuente.getvalue()
+    with open(fuente, "rb") as f:
+        return f.read()
+
+
+def _es_xlsx(datos):
+    return datos[:4] == b"PK\x03\x04"
+
+
+def motores_disponibles():
+    disponibles = []
+    try:
+        import python_calamine  # noqa: F401
+        disponibles.append("calamine")
+    except ImportError:
+        pass
+    try:
+        import openpyxl  # noqa: F401
+        disponibles += ["openpyxl_streaming", "openpyxl"]
+    except ImportError:
+        pass
+    return disponibles
+
+
+def _orden_motores(motor):
+    disponibles = motores_disponibles()
+    if motor and motor != MOTOR_AUTO:
+        # El motor elegido va primero; el resto queda como respaldo
+        return [motor] + [m for m in disponibles if m != motor]
+    return disponibles
+
+
+# 🛠️ FUNCIÓN: Nombres de hojas leyendo sólo xl/workbook.xml (sin abrir las hojas)
+def nombres_hojas(fuente):
+    datos = _datos(fuente)
+    if _es_xlsx(datos):
+        try:
+            with zipfile.ZipFile(io.BytesIO(datos)) as z:
+                raiz = ElementTree.fromstring(z.read("xl/workbook.xml"))
+            return [s.attrib["name"] for s in raiz.iter() if s.tag.endswith("}sheet")]
+        except (KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+            pass
+    return pd.ExcelFile(io.BytesIO(datos)).sheet_names
+
+
+# 🛠️ FUNCIÓN: Filas crudas de una hoja openpyxl read-only (values_only, sin objetos celda)
+def _filas_openpyxl(ws, max_filas=None):
+    ws.reset_dimensions()
+    filas = []
+    ultima_con_datos = -1
+    for i, fila in enumerate(ws.iter_rows(values_only=True)):
+        # Mismas conversiones que el lector openpyxl de pandas: None → "", float entero → int
+        fila = [
+            "" if v is None else (int(v) if type(v) is float and v.is_integer() else v)
+            for v in fila
+        ]
+        while fila and fila[-1] == "":
+            fila.pop()
+        if fila:
+            ultima_con_datos = i
+        filas.append(fila)
+        if max_filas is not None and len(filas) >= max_filas:
+            break
+
+    filas = filas[: ultima_con_datos + 1]
+    if filas:
+        ancho = max(len(f) for f in filas)
+        filas = [f + [""] * (ancho - len(f)) for f in filas]
+    return filas
+
+
+def _leer_openpyxl_streaming(datos, hojas, header=0, skiprows=None, nrows=None):
+    from openpyxl import load_workbook
+
+    max_filas = None
+    if nrows is not None:
+        max_filas = (1 if header is None else header + 1) + nrows + (skiprows or 0)
+
+    resultado = {}
+    wb = load_workbook(io.BytesIO(datos), read_only=True, data_only=True, keep_links=False)
+    try:
+        for hoja in hojas:
+            filas = _filas_openpyxl(wb[hoja], max_filas)
+            if not filas:
+                resultado[hoja] = pd.DataFrame()
+                continue
+            parser = TextParser(filas, header=header, skiprows=skiprows, nrows=nrows, skip_blank_lines=False)
+            resultado[hoja] = parser.read(nrows=nrows)
+    finally:
+        wb.close()
+    return resultado
+
+
+def _leer_pandas(datos, hojas, motor, header=0, skiprows=None, nrows=None):
+    return pd.read_excel(io.BytesIO(datos), sheet_name=list(hojas), engine=motor,
+                         header=header, skiprows=skiprows, nrows=nrows)
+
+
+def _leer_con(motor, datos, hojas, **kwargs):
+    if motor == "openpyxl_streaming":
+        return _leer_openpyxl_streaming(datos, hojas, **kwargs)
+    return _leer_pandas(datos, hojas, motor, **kwargs)
+
+
+# 🛠️ FUNCIÓN: Leer varias hojas abriendo el libro una sola vez, con respaldo automático de motor
+def leer_hojas(fuente, hojas, motor=MOTOR_AUTO, header=0, skiprows=None, nrows=None):
+    datos = _datos(fuente)
+    hojas = list(dict.fromkeys(hojas))
+    if not hojas:
+        return {}
+    if not _es_xlsx(datos):
+        # .xls u otros formatos: que pandas elija el motor
+        return pd.read_excel(io.BytesIO(datos), sheet_name=hojas, header=header, skiprows=skiprows, nrows=nrows)
+
+    etiqueta = ", ".join(hojas)
+    ultimo_error = None
+    for nombre in _orden_motores(motor):
+        inicio = time.perf_counter()
+        try:
+            resultado = _leer_con(nombre, datos, hojas, header=header, skiprows=skiprows, nrows=nrows)
+        except Exception as e:
+            segundos = time.perf_counter() - inicio
+            registro_tiempos.append((nombre, etiqueta, segundos, False))
+            logger.warning("Motor %s falló leyendo '%s' (%.2fs): %s", nombre, etiqueta, segundos, e)
+            ultimo_error = e
+            continue
+
+        segundos = time.perf_counter() - inicio
+        registro_tiempos.append((nombre, etiqueta, segundos, True))
+        logger.info("Hojas '%s' leídas con %s en %.2fs (%d filas)", etiqueta, nombre, segundos,
+                    sum(len(df) for df in resultado.values()))
+        return resultado
+
+    raise ultimo_error or RuntimeError("No hay motores de lectura Excel instalados")
+
+
+def leer_hoja(fuente, hoja, motor=MOTOR_AUTO, header=0, skiprows=None, nrows=None):
+    return leer_hojas(fuente, [hoja], motor=motor, header=header, skiprows=skiprows, nrows=nrows)[hoja]
+
+
+# 🛠️ FUNCIÓN: Vista previa sin encabezado (detección CONTPAQi) por la vía más barata
+def leer_preview(fuente, hoja, nrows=5):
+    datos = _datos(fuente)
+    if not _es_xlsx(datos):
+        return pd.read_excel(io.BytesIO(datos), sheet_name=hoja, nrows=nrows, header=None)
+
+    inicio = time.perf_counter()
+    if "calamine" in motores_disponibles():
+        motor = "calamine"
+        df = _leer_pandas(datos, [hoja], "calamine", header=None, nrows=nrows)[hoja]
+    else:
+        # openpyxl read-only deja de leer al llegar a nrows: no recorre la hoja completa
+        motor = "openpyxl_streaming"
+        df = _leer_openpyxl_streaming(datos, [hoja], header=None, nrows=nrows)[hoja]
+
+    segundos = time.perf_counter() - inicio
+    registro_tiempos.append((f"{motor} (preview)", hoja, segundos, True))
+    logger.info("Preview de '%s' con %s en %.3fs", hoja, motor, segundos)
+    return df
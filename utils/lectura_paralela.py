@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow es opcional: sin él los DataFrames vuelven serializados con pickle
+    pa = None
+
+from utils import ingesta_fondo, lector_excel
+
+# Parseo de hojas y libros en un pool de procesos: cada hoja se lee en su propio proceso (pd.read_excel
+# usa un solo núcleo). El resultado vuelve al proceso principal como un stream Arrow IPC, que se
+# serializa como un bloque contiguo en vez de objeto por objeto; las columnas que Arrow no puede
+# representar (tipos mezclados) viajan aparte con pickle.
+MAX_PROCESOS = 8
+
+_pool = None
+_pool_procesos = 0
+_candado = threading.Lock()
+
+
+def nucleos():
+    return os.cpu_count() or 1
+
+
+def procesos_por_defecto():
+    return max(1, min(MAX_PROCESOS, nucleos()))
+
+
+def _pool_de(procesos):
+    global _pool, _pool_procesos
+    with _candado:
+        if _pool is None or _pool_procesos != procesos:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # 'spawn': el servidor de Streamlit tiene hilos vivos y hacer fork de un proceso con hilos no es seguro
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+            _pool_procesos = procesos
+        return _pool
+
+
+# 🛠️ FUNCIÓN: DataFrame → (stream Arrow IPC, columnas sin representación Arrow, nombres e índice originales)
+def _empaquetar(df):
+    if pa is None or df.shape[1] == 0:
+        return {"pickle": df}
+
+    # Nombres posicionales: Arrow exige nombres str únicos y los encabezados de Excel pueden ser números
+    arreglos, nombres, resto = [], [], {}
+    for i in range(df.shape[1]):
+        serie = df.iloc[:, i]
+        try:
+            arreglos.append(pa.array(serie, from_pandas=True))
+            nombres.append(str(i))
+        except (pa.ArrowException, TypeError, ValueError):
+            resto[i] = serie.to_numpy()
+    if not arreglos:
+        return {"pickle": df}
+
+    tabla = pa.Table.from_arrays(arreglos, names=nombres)
+    salida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(salida, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return {"arrow": salida.getvalue(), "resto": resto, "columnas": df.columns, "indice": df.index}
+
+
+def _desempaquetar(paquete, arrow):
+    if "pickle" in paquete:
+        return paquete["pickle"]
+
+    tabla = pa.ipc.open_stream(paquete["arrow"]).read_all()
+    if arrow:
+        df = tabla.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = tabla.to_pandas()
+        # to_pandas deja None en las columnas object; el lector en serie deja NaN (y astype(str) distingue
+        # "None" de "nan" al pasar a categoría)
+        for nombre in df.columns[df.dtypes == object]:
+            vacios = df[nombre].isna()
+            if vacios.any():
+                df[nombre] = df[nombre].mask(vacios, np.nan)
+    for i, valores in sorted(paquete["resto"].items()):
+        df.insert(i, str(i), valores)
+    df.columns = paquete["columnas"]
+    df.index = paquete["indice"]
+    return df
+
+
+# 🛠️ FUNCIÓN: Trabajo de un proceso: leer una hoja y empaquetarla para el viaje de vuelta
+def _leer_y_empaquetar(datos, hoja, motor, opciones):
+    df = lector_excel.leer_hojas(datos, [hoja], motor=motor, **opciones)[hoja]
+    return _empaquetar(df)
+
+
+# 🛠️ FUNCIÓN: Leer varias hojas de varios libros en paralelo → una lista de {hoja: df} por libro
+#   libros: [(fuente, [hojas]), ...]. arrow=True devuelve columnas respaldadas por Arrow (pd.ArrowDtype);
+#   arrow=False las convierte a los dtypes NumPy habituales. procesos=1 lee en serie sin pool.
+def leer_libros(libros, motor=lector_excel.MOTOR_AUTO, procesos=None, arrow=True, progreso=None, **opciones):
+    # Las rutas viajan tal cual (cada proceso abre el archivo); los archivos subidos, como bytes
+    tareas = [
+        (i, fuente.getvalue() if hasattr(fuente, "getvalue") else fuente, hoja)
+        for i, (fuente, hojas) in enumerate(libros)
+        for hoja in dict.fromkeys(hojas)
+    ]
+    resultado = [{} for _ in libros]
+    ingesta_fondo.avanzar(progreso, etapa="Leyendo hojas en paralelo", hojas_total=len(tareas))
+
+    procesos = min(procesos or procesos_por_defecto(), len(tareas))
+    if procesos <= 1:
+        # Mismo empaquetado que en el pool: el resultado tiene los mismos dtypes con o sin procesos
+        for i, datos, hoja in tareas:
+            df = _desempaquetar(_leer_y_empaquetar(datos, hoja, motor, opciones), arrow)
+            resultado[i][hoja] = df
+            ingesta_fondo.avanzar(progreso, hojas=1, filas=len(df))
+        return resultado
+
+    pool = _pool_de(procesos)
+    futuros = {
+        pool.submit(_leer_y_empaquetar, datos, hoja, motor, opciones): (i, hoja)
+        for i, datos, hoja in tareas
+    }
+    for futuro in as_completed(futuros):
+        i, hoja = futuros[futuro]
+        df = _desempaquetar(futuro.result(), arrow)
+        resultado[i][hoja] = df
+        ingesta_fondo.avanzar(progreso, hojas=1, filas=len(df))
+
+    # Mismo orden de hojas que se pidió (as_completed entrega en orden de término)
+    return [
+        {hoja: leidas[hoja] for hoja in dict.fromkeys(hojas)}
+        for leidas, (_, hojas) in zip(resultado, libros)
+    ]
+
+
+def leer_hojas(fuente, hojas, motor=lector_excel.MOTOR_AUTO, procesos=None, arrow=True, progreso=None, **opciones):
+    return leer_libros([(fuente, hojas)], motor=motor, procesos=procesos, arrow=arrow, progreso=progreso, **opciones)[0]
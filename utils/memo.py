@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+# Diccionario de artefactos derivados del dataset activo (lo asigna app.py al cargar datos).
+# Vive junto al dataset en la caché de ingesta, así que se descarta cuando el dataset se expulsa.
+CLAVE_ARTEFACTOS = "artefactos_dataset"
+
+
+# Los artefactos cuelgan del dataset compartido por todas las sesiones (cache_ingesta): se consultan y
+# modifican bajo candado, y se construyen fuera de él (si dos sesiones construyen a la vez, gana la primera)
+_candado_artefactos = threading.Lock()
+
+
+def artefactos_dataset():
+    return st.session_state.get(CLAVE_ARTEFACTOS)
+
+
+# 🛠️ FUNCIÓN: Construir una sola vez por dataset (y por clave) un artefacto derivado
+def memo_dataset(nombre, constructor, *clave):
+    artefactos = artefactos_dataset()
+    if artefactos is None:
+        return constructor()
+
+    llave = (nombre, *clave)
+    with _candado_artefactos:
+        if llave in artefactos:
+            return artefactos[llave]
+
+    valor = constructor()
+    with _candado_artefactos:
+        return artefactos.setdefault(llave, valor)
+
+
+# 🛠️ FUNCIÓN: Huella del contenido de una tabla (valores, índice y columnas) para claves de caché
+def huella_tabla(tabla):
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(tabla, index=True).to_numpy().tobytes())
+    h.update(repr(tabla.columns.tolist()).encode())
+    return h.hexdigest()
+
+
+# 🛠️ FUNCIÓN: Memo LRU acotado por sesión (no depende del dataset: la clave ya identifica el contenido)
+def memo_lru(nombre, constructor, clave, max_entradas=8):
+    cache = st.session_state.setdefault(f"_lru_{nombre}", OrderedDict())
+    if clave in cache:
+        cache.move_to_end(clave)
+        return cache[clave]
+
+    valor = constructor()
+    cache[clave] = valor
+    while len(cache) > max_entradas:
+        cache.popitem(last=False)
+    return valor
+
+
+_compartidos = {}
+_candado_compartidos = threading.Lock()
+
+
+# 🛠️ FUNCIÓN: Memo LRU compartido por todas las sesiones del servidor (la clave debe identificar el contenido,
+#   p. ej. la huella del archivo): dos usuarios con el mismo archivo reutilizan el mismo resultado, de sólo lectura
+def memo_compartido(nombre, constructor, clave, max_entradas=8):
+    with _candado_compartidos:
+        cache = _compartidos.setdefault(nombre, OrderedDict())
+        if clave in cache:
+            cache.move_to_end(clave)
+            return cache[clave]
+
+    # Se construye fuera del candado: una construcción lenta no bloquea a las demás sesiones
+    valor = constructor()
+    with _candado_compartidos:
+        valor = cache.setdefault(clave, valor)
+        cache.move_to_end(clave)
+        while len(cache) > max_entradas:
+            cache.popitem(last=False)
+    return valor
+
+
+# 🛠️ FUNCIÓN: Memo LRU que vive junto al dataset (p. ej. una vista por combinación de filtros)
+def memo_dataset_lru(nombre, constructor, clave, max_entradas=8):
+    artefactos = artefactos_dataset()
+    if artefactos is None:
+        return constructor()
+
+    with _candado_artefactos:
+        cache = artefactos.setdefault(("lru", nombre), OrderedDict())
+        if clave in cache:
+            cache.move_to_end(clave)
+            return cache[clave]
+
+    valor = constructor()
+    with _candado_artefactos:
+        valor = cache.setdefault(clave, valor)
+        cache.move_to_end(clave)
+        while len(cache) > max_entradas:
+            cache.popitem(last=False)
+    return valor
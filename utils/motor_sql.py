@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import duckdb
+except ImportError:  # DuckDB es opcional: sin él se usa SQLite (biblioteca estándar)
+    duckdb = None
+
+from utils import memo, periodos
+
+# Motor de agregación: pandas (en memoria) o un motor SQL embebido en archivo local (sin servidor).
+# Los datos se cargan una vez por dataset (y columnas) y las agregaciones se resuelven en SQL.
+# Alcance: el motor SQL sólo descarga el agrupamiento (multihilo en DuckDB). Las tablas se construyen desde
+# el DataFrame normalizado, que las páginas siguen usando, así que el dataset completo debe caber en RAM:
+# no es un modo para datos más grandes que la memoria. La paridad con pandas se comprueba con
+# python -m benchmarks.paridad_sql.
+MOTOR_PANDAS = "pandas"
+MOTOR_DUCKDB = "duckdb"
+MOTOR_SQLITE = "sqlite"
+
+DIRECTORIO_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "analitica")
+ARCHIVOS = {MOTOR_DUCKDB: "fradma.duckdb", MOTOR_SQLITE: "fradma.sqlite"}
+
+# Tablas que se conservan en el archivo local (se borran las usadas hace más tiempo)
+MAX_TABLAS = 6
+
+_conexiones = {}
+_candado = threading.Lock()
+
+
+def motores_disponibles():
+    return [MOTOR_PANDAS] + ([MOTOR_DUCKDB] if duckdb is not None else []) + [MOTOR_SQLITE]
+
+
+def motor_activo():
+    return st.session_state.get("motor_agregacion", MOTOR_PANDAS)
+
+
+def _conexion(motor):
+    if motor not in _conexiones:
+        os.makedirs(DIRECTORIO_SQL, exist_ok=True)
+        ruta = os.path.join(DIRECTORIO_SQL, ARCHIVOS[motor])
+        if motor == MOTOR_DUCKDB:
+            con = duckdb.connect(ruta)
+        else:
+            con = sqlite3.connect(ruta, check_same_thread=False)
+        con.execute("CREATE TABLE IF NOT EXISTS _tablas (nombre TEXT PRIMARY KEY, creada DOUBLE)")
+        _conexiones[motor] = con
+    return _conexiones[motor]
+
+
+def _consultar(motor, sql):
+    with _candado:
+        con = _conexion(motor)
+        if motor == MOTOR_DUCKDB:
+            return con.execute(sql).df()
+        return pd.read_sql_query(sql, con)
+
+
+def _id(nombre):
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+# 🛠️ FUNCIÓN: Tabla a cargar en el motor con sólo las columnas necesarias
+#   De 'fecha' se derivan enteros para agrupar: _periodo_cod (AAAAMM), _dia_cod (AAAAMMDD), _anio y _mes (-1 sin fecha)
+def _preparar(df, columnas, motor):
+    tabla = pd.DataFrame(index=range(len(df)))
+    for col in columnas:
+        if col == "fecha":
+            continue
+        serie = df[col]
+        if motor == MOTOR_SQLITE and isinstance(serie.dtype, pd.CategoricalDtype):
+            # SQLite no conoce 'category': texto con NULL para vacíos
+            serie = serie.astype(object).where(serie.notna(), None)
+        tabla[col] = serie.to_numpy()
+    if "fecha" in columnas:
+        fechas = df["fecha"]
+        codigos = periodos.codigos_periodo(fechas, "Mensual")
+        sin_fecha = codigos == periodos.SIN_PERIODO
+        dia = fechas.dt.day.fillna(0).to_numpy(dtype=np.int64)
+        tabla["_periodo_cod"] = codigos
+        tabla["_dia_cod"] = np.where(sin_fecha, -1, codigos * 100 + dia)
+        tabla["_anio"] = np.where(sin_fecha, -1, codigos // 100)
+        tabla["_mes"] = np.where(sin_fecha, -1, codigos % 100)
+    return tabla
+
+
+# 🛠️ FUNCIÓN: Asegurar que la tabla exista en el motor (cargarla si nunca se cargó o si fue expulsada)
+#   Cada uso renueva su marca de tiempo: se expulsan las tablas usadas hace más tiempo
+def _cargar(df, columnas, motor, nombre):
+    with _candado:
+        con = _conexion(motor)
+        existe = con.execute(f"SELECT COUNT(*) FROM _tablas WHERE nombre = '{nombre}'").fetchone()[0]
+        if existe:
+            con.execute(f"UPDATE _tablas SET creada = {time.time()} WHERE nombre = '{nombre}'")
+        else:
+            tabla = _preparar(df, columnas, motor)
+            if motor == MOTOR_DUCKDB:
+                con.register("_entrada", tabla)
+                con.execute(f"CREATE OR REPLACE TABLE {_id(nombre)} AS SELECT * FROM _entrada")
+                con.unregister("_entrada")
+            else:
+                tabla.to_sql(nombre, con, if_exists="replace", index=False, chunksize=100_000)
+            con.execute(f"INSERT INTO _tablas VALUES ('{nombre}', {time.time()})")
+
+            # Sólo se conservan las tablas usadas más recientemente
+            sobrantes = con.execute(
+                f"SELECT nombre FROM _tablas ORDER BY creada DESC LIMIT -1 OFFSET {MAX_TABLAS}"
+                if motor == MOTOR_SQLITE else
+                f"SELECT nombre FROM _tablas ORDER BY creada DESC OFFSET {MAX_TABLAS}"
+            ).fetchall()
+            for (sobrante,) in sobrantes:
+                con.execute(f"DROP TABLE IF EXISTS {_id(sobrante)}")
+                con.execute(f"DELETE FROM _tablas WHERE nombre = '{sobrante}'")
+        if motor == MOTOR_SQLITE:
+            con.commit()
+    return nombre
+
+
+# 🛠️ FUNCIÓN: Nombre de la tabla SQL del dataset; 'uso' separa frames que cada módulo transforma distinto
+#   Se memoriza sólo el nombre (huella de las columnas): la existencia se verifica en cada consulta,
+#   porque otra carga puede haber expulsado la tabla del archivo local
+def tabla_sql(df, columnas, motor, uso):
+    columnas = list(dict.fromkeys(columnas))
+    nombre = memo.memo_dataset(
+        "tabla_sql", lambda: f"ventas_{memo.huella_tabla(df[columnas])[:16]}", motor, uso, tuple(columnas)
+    )
+    return _cargar(df, columnas, motor, nombre)
+
+
+def _ancho(largo, indice, columna, valor, nombre_columnas):
+    # Mismo formato que groupby(...).sum().unstack(fill_value=0)
+    ancho = largo.pivot(index=indice, columns=columna, values=valor).fillna(0)
+    return ancho.rename_axis(index=None, columns=nombre_columnas).sort_index().sort_index(axis=1)
+
+
+# 🛠️ FUNCIÓN: Cubo mensual (AAAAMM × línea) resuelto en SQL
+def cubo_mensual(df, columna_linea, columna_importe, motor):
+    tabla = tabla_sql(df, ["fecha", columna_linea, columna_importe], motor, "heatmap")
+    largo = _consultar(motor, f"""
+        SELECT _periodo_cod AS periodo, {_id(columna_linea)} AS linea, COALESCE(SUM({_id(columna_importe)}), 0) AS importe
+        FROM {_id(tabla)}
+        WHERE _periodo_cod <> {periodos.SIN_PERIODO} AND {_id(columna_linea)} IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    cubo = _ancho(largo, "periodo", "linea", "importe", columna_linea)
+    cubo.index = cubo.index.astype(np.int64)
+    return cubo
+
+
+# 🛠️ FUNCIÓN: Cubo diario (día × línea) resuelto en SQL
+def cubo_diario(df, columna_linea, columna_importe, motor):
+    tabla = tabla_sql(df, ["fecha", columna_linea, columna_importe], motor, "heatmap")
+    largo = _consultar(motor, f"""
+        SELECT _dia_cod AS dia, {_id(columna_linea)} AS linea, COALESCE(SUM({_id(columna_importe)}), 0) AS importe
+        FROM {_id(tabla)}
+        WHERE _dia_cod <> -1 AND {_id(columna_linea)} IS NOT NULL
+        GROUP BY 1, 2
+    """)
+    cubo = _ancho(largo, "dia", "linea", "importe", columna_linea)
+    cubo.index = pd.to_datetime(cubo.index.astype(np.int64).astype(str), format="%Y%m%d")
+    return cubo
+
+
+# 🛠️ FUNCIÓN: Ventas por (año, mes) resueltas en SQL (año/mes del archivo o derivados de 'fecha')
+def ventas_anio_mes(df, columna_importe, motor):
+    if "año" in df.columns and "mes" in df.columns:
+        tabla = tabla_sql(df, ["año", "mes", columna_importe], motor, "comparativo")
+        anio, mes, filtro = _id("año"), _id("mes"), f'{_id("año")} IS NOT NULL AND {_id("mes")} IS NOT NULL'
+    else:
+        tabla = tabla_sql(df, ["fecha", columna_importe], motor, "comparativo")
+        anio, mes, filtro = "_anio", "_mes", f"_periodo_cod <> {periodos.SIN_PERIODO}"
+    return _consultar(motor, f"""
+        SELECT {anio} AS "año", {mes} AS mes, COALESCE(SUM({_id(columna_importe)}), 0) AS {_id(columna_importe)}
+        FROM {_id(tabla)}
+        WHERE {filtro}
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)
+
+
+# 🛠️ FUNCIÓN: Cubo (agente, anio, línea) para ranking de agentes resuelto en SQL (como agregados.cubo_kpi)
+def cubo_kpi(df, columna_usd, motor):
+    claves = ["agente", "anio"] + (["linea_producto"] if "linea_producto" in df.columns else [])
+    tabla = tabla_sql(df, claves + [columna_usd, "valor_mn_calc"], motor, "kpi")
+    lista = ", ".join(_id(c) for c in claves)
+    cubo = _consultar(motor, f"""
+        SELECT {lista},
+               COALESCE(SUM({_id(columna_usd)}), 0) AS total_usd,
+               COALESCE(SUM(valor_mn_calc), 0) AS total_mn,
+               COUNT({_id(columna_usd)}) AS operaciones
+        FROM {_id(tabla)}
+        GROUP BY {lista}
+        ORDER BY {lista}
+    """)
+    for col in claves:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            cubo[col] = pd.Categorical(cubo[col], categories=df[col].cat.categories)
+    return cubo
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+TIPOS_PERIODO = ["Mensual", "Trimestral", "Anual", "Rango Personalizado"]
+
+# Código entero de periodo por fila; -1 para fechas vacías (NaT)
+SIN_PERIODO = -1
+
+
+# 🛠️ FUNCIÓN: Código entero de periodo por fila, derivado directo de 'fecha' (sin apply por fila)
+#   Mensual / Rango → AAAAMM · Trimestral → AAAAT · Anual → AAAA
+def codigos_periodo(fechas, periodo_tipo):
+    fechas = pd.Series(fechas)
+    validas = fechas.notna().to_numpy()
+    anio = fechas.dt.year.fillna(0).to_numpy(dtype=np.int64)
+    mes = fechas.dt.month.fillna(0).to_numpy(dtype=np.int64)
+
+    if periodo_tipo == "Trimestral":
+        codigos = anio * 10 + (mes - 1) // 3 + 1
+    elif periodo_tipo == "Anual":
+        codigos = anio
+    else:
+        codigos = anio * 100 + mes
+
+    return np.where(validas, codigos, SIN_PERIODO)
+
+
+# 🛠️ FUNCIÓN: Etiquetas de texto sólo para los códigos únicos (para mostrar en pantalla)
+#   periodo_id: "23.01" / "23.Q1" / "23" · periodo: "Jan-2023" / "2023Q1" / "2023"
+def etiquetas_periodo(codigos_unicos, periodo_tipo):
+    codigos_unicos = np.asarray(codigos_unicos, dtype=np.int64)
+
+    if periodo_tipo == "Trimestral":
+        anio, trimestre = np.divmod(codigos_unicos, 10)
+        ids = [f"{a % 100:02d}.Q{t}" for a, t in zip(anio, trimestre)]
+        periodos = [f"{a}Q{t}" for a, t in zip(anio, trimestre)]
+    elif periodo_tipo == "Anual":
+        ids = [f"{a % 100:02d}" for a in codigos_unicos]
+        periodos = [str(a) for a in codigos_unicos]
+    else:
+        anio, mes = np.divmod(codigos_unicos, 100)
+        ids = [f"{a % 100:02d}.{m:02d}" for a, m in zip(anio, mes)]
+        if periodo_tipo == "Rango Personalizado":
+            periodos = ["Rango Personalizado"] * len(codigos_unicos)
+        else:
+            inicio_mes = pd.to_datetime({"year": anio, "month": mes, "day": 1})
+            periodos = inicio_mes.dt.strftime("%b-%Y").tolist()
+
+    etiquetas = [f"{i} - {p}" for i, p in zip(ids, periodos)]
+    return pd.DataFrame(
+        {"periodo_id": ids, "periodo": periodos, "periodo_etiqueta": etiquetas},
+        index=pd.Index(codigos_unicos, name="periodo_cod"),
+    )
+
+
+# 🛠️ FUNCIÓN: Códigos por fila + tabla de etiquetas (una fila por periodo, ordenada)
+def periodos(fechas, periodo_tipo):
+    codigos = codigos_periodo(fechas, periodo_tipo)
+    unicos = np.unique(codigos[codigos != SIN_PERIODO])
+    return codigos, etiquetas_periodo(unicos, periodo_tipo)
+
+
+# 🛠️ FUNCIÓN: Grupo para comparar contra el periodo anterior equivalente
+#   Mensual → mes (ene vs ene) · Anual → el propio año
+#   Trimestral conserva el comportamiento original: su id ("21.Q1") no se puede pasar a número, así que
+#   la conversión falla y el heatmap muestra el aviso con los importes sin crecimiento
+def grupo_interanual(codigos, periodo_tipo):
+    codigos = np.asarray(codigos, dtype=np.int64)
+    if periodo_tipo == "Trimestral":
+        etiquetas_periodo(codigos, periodo_tipo)["periodo_id"].astype(float)
+    if periodo_tipo == "Mensual":
+        return codigos % 100
+    return codigos
@@ -0,0 +1,95 @@
+import io
+
+import altair as alt
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+MODO_IMAGEN = "Imagen (matplotlib)"
+MODO_INTERACTIVO = "Interactivo (Altair)"
+MODOS_RENDER = [MODO_IMAGEN, MODO_INTERACTIVO]
+
+# Tope de píxeles del lado mayor del PNG: rangos largos bajan el dpi en vez de crecer sin límite
+MAX_PIXELES = 4000
+DPI = 100
+
+# Celdas a partir de las cuales la vista de imagen se dibuja con Altair: matplotlib crea y dibuja un artista
+# de texto por celda y con tablas grandes eso domina el tiempo de render; Altair dibuja todos los textos
+# en una sola capa del navegador
+MAX_ANOTACIONES = 600
+
+
+def anota_png(tabla):
+    return tabla.size <= MAX_ANOTACIONES
+
+
+# 🛠️ FUNCIÓN: Heatmap como PNG (seaborn + anotaciones precalculadas); se cachea por vista
+def png_matplotlib(tabla, textos, colores, titulo):
+    ancho = max(10, len(tabla.columns) * 1.5)
+    alto = max(5, len(tabla.index) * 0.6)
+    dpi = min(DPI, MAX_PIXELES / max(ancho, alto))
+
+    fig, ax = plt.subplots(figsize=(ancho, alto))
+    try:
+        sns.heatmap(
+            tabla,
+            annot=False,
+            fmt="",
+            cmap="Greens",
+            cbar_kws={'label': 'Importe ($)'},
+            linewidths=0.5,
+            linecolor='gray',
+            ax=ax
+        )
+
+        ax.set_xlabel("Línea de Negocio", fontsize=12)
+        ax.set_ylabel("Periodo", fontsize=12)
+        ax.set_xticklabels(ax.get_xticklabels(), rotation=45, ha='right', fontsize=10)
+        ax.set_yticklabels(ax.get_yticklabels(), rotation=0, fontsize=10)
+        ax.set_title(titulo, fontsize=14, pad=20)
+        fig.tight_layout()
+
+        # Las anotaciones quedan dentro de sus celdas: se agregan después del ajuste de márgenes y fuera
+        # del cálculo del recorte, así sólo se miden y dibujan una vez (en el render final)
+        textos = np.asarray(textos)
+        for i, j in zip(*np.nonzero(colores != "")):
+            ax.text(
+                j + 0.5, i + 0.5, textos[i, j],
+                ha='center', va='center',
+                color=colores[i, j],
+                fontsize=8
+            ).set_in_layout(False)
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+# 🛠️ FUNCIÓN: Heatmap interactivo (Altair): celdas y textos se dibujan en el navegador en una sola capa
+def grafico_altair(tabla, textos, colores, titulo):
+    filas, columnas = tabla.shape
+    datos = pd.DataFrame({
+        "periodo": np.repeat(tabla.index.astype(str).to_numpy(), columnas),
+        "linea": np.tile(tabla.columns.astype(str).to_numpy(), filas),
+        "importe": tabla.to_numpy(dtype=float).ravel(),
+        "texto": np.asarray(textos).ravel(),
+        "color_texto": np.where(colores == "", "black", colores).ravel(),
+    })
+
+    base = alt.Chart(datos).encode(
+        x=alt.X("linea:N", sort=tabla.columns.astype(str).tolist(), title="Línea de Negocio"),
+        y=alt.Y("periodo:N", sort=tabla.index.astype(str).tolist(), title="Periodo"),
+    )
+    celdas = base.mark_rect(stroke="gray", strokeWidth=0.5).encode(
+        color=alt.Color("importe:Q", scale=alt.Scale(scheme="greens"), title="Importe ($)"),
+        tooltip=["periodo:N", "linea:N", alt.Tooltip("importe:Q", format="$,.2f")],
+    )
+    etiquetas = base.mark_text(fontSize=8, lineBreak="\n").encode(
+        text="texto:N",
+        color=alt.Color("color_texto:N", scale=None),
+    )
+
+    return (celdas + etiquetas).properties(title=titulo, height=max(300, 28 * filas))
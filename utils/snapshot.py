@@ -0,0 +1,131 @@
+import logging
+import os
+import re
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow es opcional: sin él simplemente no hay snapshots
+    pa = None
+    feather = None
+
+logger = logging.getLogger(__name__)
+
+# ⚠️ Incrementar cada vez que cambie la lógica de normalización (columnas, año/mes, fecha, tipos):
+# los snapshots con otra versión se ignoran y se regeneran.
+VERSION_NORMALIZACION = 3
+
+DIRECTORIO_SNAPSHOTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "snapshots")
+
+# Tope de disco para los snapshots (expulsión LRU: cada lectura renueva la fecha de modificación)
+MAX_MB = 2048
+
+_META_VERSION = b"fradma_version"
+_META_HUELLA = b"fradma_huella"
+
+
+def disponible():
+    return pa is not None
+
+
+def _slug(hoja, variante=""):
+    slug = re.sub(r"[^0-9a-zA-Z]+", "_", hoja or "").strip("_").lower() or "csv"
+    return f"{slug}_{variante}" if variante else slug
+
+
+def ruta_snapshot(huella, hoja=None, variante=""):
+    nombre = f"ventas_{huella[:24]}_{_slug(hoja, variante)}_v{VERSION_NORMALIZACION}.feather"
+    return os.path.join(DIRECTORIO_SNAPSHOTS, nombre)
+
+
+# 🛠️ FUNCIÓN: Leer snapshot columnar con memory-mapping (None si no existe o es de otra versión)
+def leer(huella, hoja=None, variante=""):
+    if not disponible():
+        return None
+
+    ruta = ruta_snapshot(huella, hoja, variante)
+    if not os.path.exists(ruta):
+        return None
+
+    try:
+        with pa.memory_map(ruta, "r") as fuente:
+            tabla = pa.ipc.open_file(fuente).read_all()
+        meta = tabla.schema.metadata or {}
+        if meta.get(_META_VERSION) != str(VERSION_NORMALIZACION).encode() or meta.get(_META_HUELLA) != huella.encode():
+            logger.info("Snapshot %s con versión/huella distinta, se ignora", ruta)
+            return None
+        _marcar_uso(ruta)
+        return tabla.to_pandas()
+    except Exception as e:
+        logger.warning("No se pudo leer snapshot %s: %s", ruta, e)
+        return None
+
+
+# 🛠️ FUNCIÓN: Escribir snapshot tipado (Feather sin compresión → lectura con memory-map)
+def escribir(df, huella, hoja=None, variante=""):
+    if not disponible():
+        return False
+
+    ruta = ruta_snapshot(huella, hoja, variante)
+    try:
+        os.makedirs(DIRECTORIO_SNAPSHOTS, exist_ok=True)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        tabla = tabla.replace_schema_metadata({
+            **(tabla.schema.metadata or {}),
+            _META_VERSION: str(VERSION_NORMALIZACION).encode(),
+            _META_HUELLA: huella.encode(),
+        })
+
+        # Escritura atómica: otro proceso nunca ve un archivo a medias
+        temporal = f"{ruta}.tmp{os.getpid()}"
+        feather.write_feather(tabla, temporal, compression="uncompressed")
+        os.replace(temporal, ruta)
+    except Exception as e:
+        logger.warning("No se pudo escribir snapshot %s: %s", ruta, e)
+        return False
+
+    _limpiar_versiones_anteriores(huella, hoja, variante)
+    _expulsar(ruta)
+    return True
+
+
+def _marcar_uso(ruta):
+    try:
+        os.utime(ruta)
+    except OSError:
+        pass
+
+
+# 🛠️ FUNCIÓN: Borrar los snapshots usados hace más tiempo hasta quedar bajo MAX_MB (nunca el recién escrito)
+def _expulsar(vigente):
+    archivos = []
+    for nombre in os.listdir(DIRECTORIO_SNAPSHOTS):
+        ruta = os.path.join(DIRECTORIO_SNAPSHOTS, nombre)
+        if not nombre.endswith(".feather") or ruta == vigente:
+            continue
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        archivos.append((info.st_mtime, info.st_size, ruta))
+
+    total = sum(tamano for _, tamano, _ in archivos) + os.path.getsize(vigente)
+    for _, tamano, ruta in sorted(archivos):
+        if total <= MAX_MB * 1024 ** 2:
+            break
+        try:
+            os.remove(ruta)
+            total -= tamano
+        except OSError as e:
+            logger.warning("No se pudo borrar snapshot %s: %s", ruta, e)
+
+
+def _limpiar_versiones_anteriores(huella, hoja, variante):
+    prefijo = f"ventas_{huella[:24]}_{_slug(hoja, variante)}_v"
+    vigente = os.path.basename(ruta_snapshot(huella, hoja, variante))
+    for nombre in os.listdir(DIRECTORIO_SNAPSHOTS):
+        if nombre.startswith(prefijo) and nombre != vigente:
+            try:
+                os.remove(os.path.join(DIRECTORIO_SNAPSHOTS, nombre))
+            except OSError:
+                pass
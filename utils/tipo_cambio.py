@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils import memo
+
+DIRECTORIO_DATOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Tabla local de tasas (fecha, tipo_cambio); se usa la primera que exista. Puede ser diaria, mensual o anual:
+# cada venta toma la última tasa con fecha <= a la suya (as-of).
+RUTAS_TABLA = [
+    os.path.join(DIRECTORIO_DATOS, "tipos_cambio.parquet"),
+    os.path.join(DIRECTORIO_DATOS, "tipos_cambio.csv"),
+]
+
+# Respaldo si no hay tabla local: promedio anual vigente desde el 1 de enero
+TIPOS_CAMBIO_ANUALES = {
+    2018: 19.24,
+    2019: 19.26,
+    2020: 21.49,
+    2021: 20.28,
+    2022: 20.13,
+    2023: 17.81,
+    2024: 18.325,
+    2025: 20.00
+}
+
+# Tasa para fechas vacías o anteriores a la primera tasa de la tabla
+TIPO_CAMBIO_DEFECTO = 17.0
+
+
+def ruta_tabla():
+    for ruta in RUTAS_TABLA:
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def _leer_tabla(ruta):
+    if ruta is None:
+        tabla = pd.DataFrame({
+            "fecha": pd.to_datetime([f"{anio}-01-01" for anio in TIPOS_CAMBIO_ANUALES]),
+            "tipo_cambio": list(TIPOS_CAMBIO_ANUALES.values()),
+        })
+    elif ruta.endswith(".parquet"):
+        tabla = pd.read_parquet(ruta, columns=["fecha", "tipo_cambio"])
+    else:
+        tabla = pd.read_csv(ruta, usecols=["fecha", "tipo_cambio"])
+
+    tabla["fecha"] = pd.to_datetime(tabla["fecha"], errors="coerce")
+    tabla["tipo_cambio"] = pd.to_numeric(tabla["tipo_cambio"], errors="coerce")
+    tabla = tabla.dropna().sort_values("fecha", kind="stable")
+    # Si una fecha se repite gana la última fila del archivo
+    return tabla.drop_duplicates("fecha", keep="last").reset_index(drop=True)
+
+
+# 🛠️ FUNCIÓN: Tabla de tasas ordenada por fecha; se relee sólo si el archivo cambia
+def tabla_tipos_cambio():
+    ruta = ruta_tabla()
+    version = (ruta, os.path.getmtime(ruta) if ruta else None)
+    tabla = memo.memo_compartido("tabla_tipos_cambio", lambda: _leer_tabla(ruta), version, max_entradas=2)
+    return tabla, version
+
+
+# 🛠️ FUNCIÓN: Tasa por fila con búsqueda binaria sobre las fechas de la tabla (sin map por año)
+def tipos_por_fecha(fechas, tabla):
+    fechas = pd.Series(fechas)
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors="coerce")
+
+    if tabla.empty:
+        return np.full(len(fechas), TIPO_CAMBIO_DEFECTO)
+
+    claves = tabla["fecha"].to_numpy(dtype="datetime64[ns]")
+    tasas = tabla["tipo_cambio"].to_numpy(dtype=np.float64)
+    valores = fechas.to_numpy(dtype="datetime64[ns]")
+
+    pos = np.searchsorted(claves, valores, side="right") - 1
+    validas = (pos >= 0) & ~np.isnat(valores)
+    return np.where(validas, tasas[np.maximum(pos, 0)], TIPO_CAMBIO_DEFECTO)
+
+
+# 🛠️ FUNCIÓN: Columnas de conversión (anio, tipo_cambio, valor_mn_calc), alineadas por posición con df
+def conversion_mn(df, columna_usd, tabla):
+    fechas = df["fecha"]
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors="coerce")
+
+    tasas = tipos_por_fecha(fechas, tabla)
+    return pd.DataFrame({
+        "anio": fechas.dt.year.to_numpy(),
+        "tipo_cambio": tasas,
+        "valor_mn_calc": df[columna_usd].to_numpy(dtype=np.float64) * tasas,
+    }, index=df.index)
+
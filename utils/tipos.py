@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Esquema de tipos para los datos de ventas normalizados (nombres ya pasados por normalizar_columnas)
+COLUMNAS_FECHA = {"fecha"}
+
+COLUMNAS_IMPORTE = {
+    "valor_usd", "ventas_usd", "ventas_usd_con_iva", "valor_mn", "importe",
+}
+
+COLUMNAS_CATEGORIA = {
+    "agente", "vendedor", "ejecutivo",
+    "linea_producto", "linea_prodcucto", "linea_de_negocio", "linea_de_producto",
+    "cliente", "razon_social", "estatus", "moneda",
+}
+
+# Columnas de texto fuera del esquema se vuelven 'category' si tienen pocos valores distintos
+UMBRAL_CARDINALIDAD = 0.5
+
+
+def memoria_mb(df):
+    return float(df.memory_usage(deep=True).sum()) / 1024 ** 2
+
+
+def _a_categoria(serie):
+    # Igual que el antiguo astype(str): valores mixtos y NaN quedan como texto ("nan")
+    return serie.astype(str).astype("category")
+
+
+def _es_categoria(col, serie):
+    n = len(serie)
+    return col in COLUMNAS_CATEGORIA or bool(n and serie.nunique(dropna=False) / n <= UMBRAL_CARDINALIDAD)
+
+
+# 🛠️ FUNCIÓN: Etapa de tipos guiada por esquema (reemplaza el astype(str) general)
+#   categorias: columnas de texto que deben ser 'category' (lectura por bloques: se fija con el primer bloque)
+def aplicar_tipos(df, float32=False, categorias=None):
+    antes = memoria_mb(df)
+    tipo_importe = "float32" if float32 else "float64"
+
+    for col in df.columns:
+        serie = df[col]
+
+        if col in COLUMNAS_FECHA:
+            if not pd.api.types.is_datetime64_any_dtype(serie):
+                df[col] = pd.to_datetime(serie, errors="coerce")
+
+        elif col in COLUMNAS_IMPORTE:
+            df[col] = pd.to_numeric(serie, errors="coerce").astype(tipo_importe)
+
+        elif serie.dtype == object:
+            es_categoria = col in categorias if categorias is not None else _es_categoria(col, serie)
+            if es_categoria:
+                df[col] = _a_categoria(serie)
+            else:
+                df[col] = serie.astype(str)
+
+    despues = memoria_mb(df)
+    reporte = {
+        "memoria_antes_mb": round(antes, 2),
+        "memoria_despues_mb": round(despues, 2),
+        "reduccion": round(antes / despues, 2) if despues else None,
+        "tipos": df.dtypes.astype(str).to_dict(),
+    }
+    return df, reporte
+
+
+# 🛠️ FUNCIÓN: Rehacer con el dataset completo la decisión texto / 'category' tomada con el primer bloque
+#   (mismo resultado que aplicar_tipos sobre el archivo entero)
+def revisar_categorias(df):
+    for col in df.columns:
+        serie = df[col]
+        es_categoria = isinstance(serie.dtype, pd.CategoricalDtype)
+        if col in COLUMNAS_CATEGORIA or not (es_categoria or serie.dtype == object):
+            continue
+        if _es_categoria(col, serie) != es_categoria:
+            df[col] = serie.astype(str) if es_categoria else _a_categoria(serie)
+    return df
+
+
+# 🛠️ FUNCIÓN: Concatenar bloques/particiones conservando 'category' (categorías unidas y ordenadas)
+def concatenar(bloques):
+    # Copias superficiales: se reasignan columnas sin tocar los frames originales
+    bloques = [b.copy(deep=False) for b in bloques if b is not None]
+    if not bloques:
+        return pd.DataFrame()
+
+    columnas_cat = {
+        col for b in bloques for col in b.columns if isinstance(b[col].dtype, pd.CategoricalDtype)
+    }
+    for col in columnas_cat:
+        for b in bloques:
+            if col in b.columns and not isinstance(b[col].dtype, pd.CategoricalDtype):
+                b[col] = _a_categoria(b[col])
+        categorias = sorted(set().union(*(b[col].cat.categories for b in bloques if col in b.columns)))
+        for b in bloques:
+            if col in b.columns:
+                b[col] = b[col].cat.set_categories(categorias)
+            else:
+                b[col] = pd.Categorical(np.full(len(b), np.nan), categories=categorias)
+    return pd.concat(bloques, ignore_index=True)